@@ -0,0 +1,273 @@
+"""
+Offline compliance verification through the OpenAI Batch API.
+
+The Compliance Checker normally runs inside every /api/ask request. For
+audits, evaluations, or nightly re-scoring of stored answers, nobody is
+waiting on the result — so this script sends all verification calls as
+one OpenAI batch job instead, which costs 50% less and has much higher
+rate limits (results arrive within 24 hours, usually far sooner).
+
+Input: a JSONL file with one stored answer per line:
+    {"custom_id": "q-001", "question": "What does SR 11-7 ...?", "answer": "..."}
+("custom_id" is optional and defaults to the line number.)
+
+Output: a JSONL file with one line per input, keyed by custom_id:
+    {"custom_id": "q-001", "question": ..., "answer": ..., "verification": {...}}
+where "verification" has the same shape as the live Compliance Checker's.
+
+Each answer is checked against the passages the live pipeline would
+retrieve for its question: the Router and Retriever agents run again,
+with the same filters and k. (An answer that was rewritten after a
+low-confidence retry drew on the wider search, so it may score lower
+here than it did live.) Answers with no checkable claims get the
+checker's usual 0-claim result without a batch request.
+
+Run with (from backend/):
+  python -m agents.checker_batch --queries queries.jsonl --output verified.jsonl
+
+If the script is interrupted while waiting, resume with --batch-id.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from openai import OpenAI
+from openai.lib import type_to_response_format_param
+from pydantic import ValidationError
+
+from agents.compliance_checker import (
+    VERIFICATION_PROMPT,
+    VERIFIER_MODEL,
+    VerificationResult,
+    build_verification,
+    extract_claims,
+    format_claims,
+    format_sources_for_check,
+)
+from agents.retriever import retriever_agent
+from agents.router import router_agent
+from ingestion.retriever import aembed_query
+
+load_dotenv()
+
+# The same structured outputs the live checker uses: the Batch API accepts
+# the full chat completions body, so every response matches
+# VerificationResult's strict JSON schema.
+RESPONSE_FORMAT = type_to_response_format_param(VerificationResult)
+
+# How many questions are re-retrieved at once. A nightly run can cover
+# thousands of stored answers; each one embeds the question (an OpenAI
+# call), may ask the Router LLM, and runs a Chroma query in a worker thread.
+MAX_CONCURRENT_SEARCHES = 10
+
+# Batch jobs move through validating -> in_progress -> finalizing -> completed
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def load_records(path: Path) -> list[dict]:
+    """Read the input JSONL, filling in a custom_id where it is missing."""
+    records = []
+    with path.open() as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record.setdefault("custom_id", str(line_number))
+            records.append(record)
+    return records
+
+
+async def retrieve_sources(question: str) -> list:
+    """
+    Retrieve the passages the live pipeline verifies an answer against.
+
+    Runs the Router and Retriever agents just like ask_question(), so
+    LOOKUP questions get the regulation-filtered search and COMPARE
+    questions the per-regulation one.
+    """
+    state = {
+        "query": question,
+        "query_embedding": await aembed_query(question),
+        "retry_count": 0,
+    }
+    state.update(await router_agent(state))
+    state = await retriever_agent(state)
+    return state["retrieved_docs"]
+
+
+async def build_requests(records: list[dict]) -> list[dict]:
+    """
+    Build one Batch API request line per record that has claims.
+
+    Sources are re-retrieved for each question (up to
+    MAX_CONCURRENT_SEARCHES at a time), and the answer is split into
+    numbered claims exactly like the live Compliance Checker does.
+    Records without claims are left out: there is nothing to verify.
+    """
+    records = [record for record in records if extract_claims(record["answer"])]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+    async def search(question: str) -> list:
+        async with semaphore:
+            return await retrieve_sources(question)
+
+    all_docs = await asyncio.gather(*(search(record["question"]) for record in records))
+
+    requests = []
+    for record, docs in zip(records, all_docs):
+        prompt = VERIFICATION_PROMPT.format(
+            sources=format_sources_for_check(docs),
+            claims=format_claims(extract_claims(record["answer"])),
+        )
+        requests.append({
+            "custom_id": record["custom_id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": VERIFIER_MODEL,
+                "temperature": 0,
+                "response_format": RESPONSE_FORMAT,
+                "messages": [{"role": "user", "content": prompt}],
+            },
+        })
+    return requests
+
+
+def submit_batch(client: OpenAI, requests: list[dict]) -> str:
+    """Upload the requests as a JSONL file and start a batch job."""
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+        for request in requests:
+            f.write(json.dumps(request) + "\n")
+        batch_path = Path(f.name)
+
+    try:
+        with batch_path.open("rb") as f:
+            batch_file = client.files.create(file=f, purpose="batch")
+    finally:
+        batch_path.unlink()
+
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def wait_for_batch(client: OpenAI, batch_id: str, poll_seconds: float):
+    """Poll the batch job until it finishes, printing progress."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        done = f"{counts.completed}/{counts.total}" if counts else "?"
+        print(f"  Batch {batch_id}: {batch.status} ({done} requests done)")
+
+        if batch.status in FINISHED_STATUSES:
+            return batch
+        time.sleep(poll_seconds)
+
+
+def read_labels(client: OpenAI, batch) -> dict[str, VerificationResult | None]:
+    """
+    Download the batch output and parse each response.
+
+    Returns a map of custom_id -> VerificationResult, or None for requests
+    that failed. Structured outputs make schema mismatches very unlikely,
+    but a truncated or refused response still parses to None.
+    """
+    results = {}
+    if batch.output_file_id is None:
+        return results
+
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        item = json.loads(line)
+        response = item.get("response") or {}
+        if response.get("status_code") != 200:
+            results[item["custom_id"]] = None
+            continue
+
+        content = response["body"]["choices"][0]["message"]["content"]
+        try:
+            results[item["custom_id"]] = VerificationResult.model_validate_json(content)
+        except ValidationError:
+            results[item["custom_id"]] = None
+
+    return results
+
+
+def merge_results(records: list[dict], labels: dict) -> list[dict]:
+    """
+    Attach a verification dict to every record, keyed by custom_id.
+
+    Records without claims get the same 0-claim result as the live
+    checker. None means the record's batch request failed.
+    """
+    merged = []
+    for record in records:
+        claims = extract_claims(record["answer"])
+        result = labels.get(record["custom_id"])
+
+        if not claims:
+            verification = build_verification([], {})
+        elif result is None:
+            verification = None
+        else:
+            by_id = {label.id: label for label in result.claims}
+            verification = build_verification(claims, by_id)
+
+        merged.append({**record, "verification": verification})
+    return merged
+
+
+def main():
+    """Run (or resume) an offline batch verification job."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--queries", type=Path, required=True,
+                        help="JSONL file of stored questions and answers")
+    parser.add_argument("--output", type=Path, default=Path("verified.jsonl"),
+                        help="Where to write the verified results (JSONL)")
+    parser.add_argument("--batch-id",
+                        help="Resume waiting on an already-submitted batch")
+    parser.add_argument("--poll-interval", type=float, default=60,
+                        help="Seconds between status checks (default 60)")
+    args = parser.parse_args()
+
+    client = OpenAI()
+    records = load_records(args.queries)
+    if not records:
+        print(f"No records found in {args.queries}")
+        sys.exit(1)
+
+    batch_id = args.batch_id
+    if batch_id is None:
+        print(f"Building verification requests for {len(records)} answers...")
+        requests = asyncio.run(build_requests(records))
+        if requests:
+            batch_id = submit_batch(client, requests)
+            print(f"Submitted batch {batch_id} ({len(requests)} requests)")
+        else:
+            print("No answer has checkable claims; nothing to submit")
+
+    labels = {}
+    if batch_id is not None:
+        print("Waiting for the batch to finish...")
+        batch = wait_for_batch(client, batch_id, args.poll_interval)
+        labels = read_labels(client, batch)
+
+    merged = merge_results(records, labels)
+    with args.output.open("w") as f:
+        for record in merged:
+            f.write(json.dumps(record) + "\n")
+
+    verified = sum(1 for record in merged if record["verification"] is not None)
+    print(f"Wrote {verified}/{len(merged)} verified results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
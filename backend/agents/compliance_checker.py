@@ -4,6 +4,21 @@ Compliance Checker Agent — verifies the answer is grounded in sources.
 This is the last agent in the pipeline. It takes the Synthesizer's answer
 and checks every claim against the retrieved source documents.
 
+Verification happens in two steps:
+1. extract_claims() splits the answer into claims locally (no LLM needed)
+2. One batched LLM call labels all numbered claims at once. OpenAI
+   structured outputs guarantee the response matches VerificationResult
+   (one {"id", "status", "source"} entry per claim), so no JSON parsing
+   or fallback is needed
+
+The confidence score and summary are then computed here from the labels,
+rather than asked of the LLM.
+
+verify_answer_stream() does the same while the answer is still being
+streamed: each batch of complete sentences is verified in the background
+as soon as it arrives, so most of the checking overlaps with generation
+(and with the other batches).
+
 Why this matters:
 - LLMs can "hallucinate" — generate plausible-sounding but incorrect info
 - In regulated industries, incorrect compliance guidance is dangerous
@@ -15,32 +30,54 @@ Output includes:
 - A summary of the verification
 """
 
-import json
-import logging
+import asyncio
+import re
+from collections.abc import AsyncIterator
+from typing import Literal
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
 from agents.state import AgentState
-
-logger = logging.getLogger(__name__)
+from http_clients import get_async_http_client, get_http_client
 
 load_dotenv()
 
-# Use gpt-4o-mini for verification — it's a structured evaluation task
+
+class ClaimLabel(BaseModel):
+    """The LLM's verdict on one numbered claim."""
+    id: int
+    status: Literal["SUPPORTED", "PARTIAL", "UNSUPPORTED"]
+    source: str | None
+
+
+class VerificationResult(BaseModel):
+    """Structured output schema for the verification call."""
+    claims: list[ClaimLabel]
+
+
+# Use gpt-4o-mini for verification — it's a structured evaluation task.
+# with_structured_output makes the model return a VerificationResult.
+VERIFIER_MODEL = "gpt-4o-mini"
 _llm = None
 
 
 def get_llm():
     global _llm
     if _llm is None:
-        _llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        _llm = ChatOpenAI(
+            model=VERIFIER_MODEL,
+            temperature=0,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        ).with_structured_output(VerificationResult)
     return _llm
 
 VERIFICATION_PROMPT = """You are a fact-checker for regulatory compliance content.
 
-Your job: Compare the ANSWER against the SOURCE DOCUMENTS and verify each claim.
+Your job: Check each numbered CLAIM against the SOURCE DOCUMENTS.
 
-For each distinct claim or statement in the answer, determine:
+Label every claim with one status:
 - SUPPORTED: The claim is directly backed by text in the source documents
 - PARTIAL: The claim is related to source content but not an exact match
 - UNSUPPORTED: No source document supports this claim
@@ -48,61 +85,194 @@ For each distinct claim or statement in the answer, determine:
 SOURCE DOCUMENTS:
 {sources}
 
-ANSWER TO VERIFY:
-{answer}
+CLAIMS:
+{claims}
+
+Return one entry per claim, using the claim's number as its id.
+Set source to "Regulation Name, Page X" for supported or partial claims,
+and null for unsupported ones."""
+
+# Sentence boundaries: end punctuation followed by whitespace and the
+# start of a new sentence (capital letter, citation bracket, or quote).
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z\[(\"'])")
+
+# Bullet or numbered-list markers at the start of a line ("- ", "1. ")
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
 
-Respond with valid JSON only (no markdown, no extra text):
-{{
-  "claims": [
-    {{"text": "the claim text", "status": "SUPPORTED", "source": "Regulation Name, Page X"}},
-    {{"text": "another claim", "status": "UNSUPPORTED", "source": null}}
-  ],
-  "confidence": 0.85,
-  "summary": "X of Y claims are supported by source documents"
-}}
+# Shorter fragments are headings or connectives, not checkable claims
+MIN_CLAIM_WORDS = 4
 
-The confidence score should be:
-- 1.0 if all claims are SUPPORTED
-- 0.0 if all claims are UNSUPPORTED
-- Proportional based on the ratio of SUPPORTED claims"""
+# A citation on its own ("[Source: SR 11-7, Page 12]") cites the sentence
+# before it and makes no claim itself
+_CITATION_ONLY = re.compile(r"^\[Source:[^\]]*\]\.?$")
+
+# While streaming, claims are sent for verification in batches this size
+CLAIM_BATCH_SIZE = 4
+
+# Most batches verified at once for one answer. Long answers would
+# otherwise send a burst of calls to OpenAI and run into rate limits.
+MAX_CONCURRENT_BATCHES = 3
 
 
 def format_sources_for_check(docs: list) -> str:
     """Format source documents for the verification prompt."""
-    formatted = []
-    for doc in docs:
-        regulation = doc.metadata.get("regulation", "Unknown")
-        page = doc.metadata.get("page", "?")
-        formatted.append(f"[{regulation} | Page {page}]\n{doc.page_content}")
+    return "\n\n".join(
+        f"[{doc.metadata.get('regulation', 'Unknown')} | "
+        f"Page {doc.metadata.get('page', '?')}]\n{doc.page_content}"
+        for doc in docs
+    )
+
+
+def extract_claims(answer: str) -> list[str]:
+    """
+    Split an answer into individual claims, one per sentence or list item.
+
+    This is a simple regex splitter — good enough because the Synthesizer
+    writes short, cited sentences and numbered lists.
+
+    Example:
+        "SR 11-7 requires validation [Source: SR 11-7, Page 9]. It must be
+        independent." -> ["SR 11-7 requires validation [...].",
+                          "It must be independent."]
+    """
+    claims = []
+    for line in answer.splitlines():
+        line = _LIST_MARKER.sub("", line).strip()
+        for sentence in SENTENCE_BOUNDARY.split(line):
+            sentence = sentence.strip()
+            if _CITATION_ONLY.match(sentence):
+                continue
+            if len(sentence.split()) >= MIN_CLAIM_WORDS:
+                claims.append(sentence)
+    return claims
+
+
+def format_claims(claims: list[str], first_id: int = 1) -> str:
+    """Number the claims so the LLM can refer to them by id."""
+    return "\n".join(f"{i}. {claim}" for i, claim in enumerate(claims, start=first_id))
 
-    return "\n\n".join(formatted)
 
+def complete_text_end(text: str, start: int = 0) -> int:
+    """
+    Return where the complete sentences of a partial answer end.
+
+    text[:end] only contains finished lines and sentences, so its claims
+    won't change as more tokens arrive. A sentence only counts as finished
+    once the next one has started (see SENTENCE_BOUNDARY).
+    """
+    end = max(start, text.rfind("\n") + 1)
+    for match in SENTENCE_BOUNDARY.finditer(text, end):
+        end = match.end()
+    return end
+
+
+def build_verification(claims: list[str], labels: dict[int, ClaimLabel]) -> dict:
+    """
+    Combine claim texts with their labels and compute the confidence.
 
-def parse_verification_response(response_text: str) -> dict:
+    Claims the LLM skipped are counted as UNSUPPORTED.
+
+    The confidence score is the ratio of SUPPORTED claims:
+    - 1.0 if all claims are SUPPORTED
+    - 0.0 if all claims are UNSUPPORTED (or there are no claims at all)
+    """
+    results = []
+    for i, text in enumerate(claims, start=1):
+        label = labels.get(i)
+        if label is None:
+            results.append({"text": text, "status": "UNSUPPORTED", "source": None})
+        else:
+            results.append({"text": text, "status": label.status, "source": label.source})
+
+    supported = sum(1 for claim in results if claim["status"] == "SUPPORTED")
+    total = len(results)
+
+    return {
+        "claims": results,
+        "confidence": round(supported / total, 2) if total else 0.0,
+        "summary": f"{supported} of {total} claims are supported by source documents",
+    }
+
+
+async def verify_claims(
+    claims: list[str],
+    sources: str,
+    first_id: int = 1,
+) -> dict[int, ClaimLabel]:
     """
-    Parse the LLM's JSON response. Handle cases where it might
-    return malformed JSON or add extra text around the JSON.
+    Label a batch of claims with one LLM call.
+
+    Claims are numbered from first_id, so batches of one answer can be
+    verified separately and merged. Returns a map of claim id -> label.
     """
-    text = response_text.strip()
+    prompt = VERIFICATION_PROMPT.format(
+        sources=sources,
+        claims=format_claims(claims, first_id),
+    )
+    result = await get_llm().ainvoke(prompt)
+
+    last_id = first_id + len(claims) - 1
+    return {label.id: label for label in result.claims if first_id <= label.id <= last_id}
 
-    # Sometimes LLMs wrap JSON in markdown code blocks
-    if text.startswith("```"):
-        # Remove ```json and ``` markers
-        lines = text.split("\n")
-        text = "\n".join(lines[1:-1])
+
+async def verify_answer_stream(
+    chunks: AsyncIterator[str],
+    docs: list,
+) -> tuple[str, dict]:
+    """
+    Verify an answer while it is still being generated.
+
+    Reads the answer from a stream of text chunks. Whenever
+    CLAIM_BATCH_SIZE complete claims are available, a background task
+    verifies them with verify_claims(). Batches are checked concurrently
+    (at most MAX_CONCURRENT_BATCHES at a time) and overlap with
+    generation, so once the stream ends only the last batch is usually
+    left to check.
+
+    Returns:
+        (the full answer, the same verification dict as the agent)
+    """
+    sources = format_sources_for_check(docs)
+    limit = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+    checks: list[asyncio.Task] = []
+    labels: dict[int, ClaimLabel] = {}
+
+    async def check_batch(first_id: int, batch_claims: list[str]):
+        async with limit:
+            labels.update(await verify_claims(batch_claims, sources, first_id))
+
+    answer = ""
+    claims = []
+    split_upto = 0  # answer[:split_upto] has been split into claims
+    queued = 0      # claims[:queued] are being verified
+
+    def queue_claims(final: bool):
+        nonlocal queued
+        while len(claims) - queued >= CLAIM_BATCH_SIZE or (final and len(claims) > queued):
+            batch = claims[queued:queued + CLAIM_BATCH_SIZE]
+            checks.append(asyncio.create_task(check_batch(queued + 1, batch)))
+            queued += len(batch)
 
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        logger.warning("Failed to parse verification JSON: %s", text[:200])
-        return {
-            "claims": [],
-            "confidence": 0.5,
-            "summary": "Could not parse verification response",
-        }
+        async for chunk in chunks:
+            answer += chunk
+            end = complete_text_end(answer, split_upto)
+            if end > split_upto:
+                claims.extend(extract_claims(answer[split_upto:end]))
+                split_upto = end
+                queue_claims(final=False)
+
+        claims.extend(extract_claims(answer[split_upto:]))
+        queue_claims(final=True)
+        await asyncio.gather(*checks)
+    finally:
+        for check in checks:
+            check.cancel()
 
+    return answer, build_verification(claims, labels)
 
-def compliance_checker_agent(state: AgentState) -> AgentState:
+
+async def compliance_checker_agent(state: AgentState) -> AgentState:
     """
     Verify that the answer is grounded in source documents.
 
@@ -112,21 +282,15 @@ def compliance_checker_agent(state: AgentState) -> AgentState:
     answer = state["answer"]
     docs = state["retrieved_docs"]
 
-    # Format sources for the prompt
-    sources_text = format_sources_for_check(docs)
-
-    # Build the verification prompt
-    prompt = VERIFICATION_PROMPT.format(
-        sources=sources_text,
-        answer=answer,
-    )
-
-    # Call the LLM
-    response = get_llm().invoke(prompt)
+    # Step 1: Split the answer into claims (no LLM needed)
+    claims = extract_claims(answer)
+    if not claims:
+        state["verification"] = build_verification([], {})
+        return state
 
-    # Parse the JSON response
-    verification = parse_verification_response(response.content)
+    # Step 2: Label all claims in one batched LLM call
+    labels = await verify_claims(claims, format_sources_for_check(docs))
 
-    state["verification"] = verification
+    state["verification"] = build_verification(claims, labels)
 
     return state
@@ -7,67 +7,154 @@ This agent uses the query type (from the Router) to decide HOW to search:
 - CHECKLIST/EXPLAIN queries do a general search
 
 The retrieved documents are passed to the Synthesizer to generate an answer.
+To keep its prompt small, the Synthesizer only sees a few diverse chunks
+(context_docs, picked with MMR from retrieved_docs); the Compliance
+Checker verifies the answer against the full retrieved set, so it sees
+every passage the answer can cite.
+
+The query is embedded once by ask_question() (it doubles as the response
+cache key), so the searches here reuse that vector instead of embedding
+the query again.
 """
 
-from agents.state import AgentState
-from ingestion.retriever import similarity_search
+import logging
+
+from agents.state import AgentState, QueryType
+from ingestion.retriever import (
+    asimilarity_search,
+    asimilarity_search_multi,
+    asimilarity_search_with_context,
+)
+
+logger = logging.getLogger(__name__)
+
+# How many chunks the Synthesizer gets in its prompt (when MMR is used)
+CONTEXT_K = 4
+
+
+def _dedupe(docs: list) -> list:
+    """
+    Drop repeated chunks, keeping the first (highest ranked) copy.
+
+    The same text can be stored more than once, e.g. when ingestion is
+    re-run or a page is shared by several regulation PDFs, and sending it
+    twice only makes the prompts longer. Chunks count as duplicates when
+    their source, page and text all match.
+    """
+    seen = set()
+    unique = []
+    for doc in docs:
+        key = (doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content)
+        if key not in seen:
+            seen.add(key)
+            unique.append(doc)
+    return unique
 
 
-def retriever_agent(state: AgentState) -> AgentState:
+async def retriever_agent(state: AgentState) -> AgentState:
     """
     Retrieve relevant regulatory passages from ChromaDB.
 
-    Input state needs: query, query_type, target_regulations
-    Output state adds: retrieved_docs, increments retry_count
+    Input state needs: query, query_type, target_regulations, query_embedding
+    Output state adds: retrieved_docs, context_docs, increments retry_count
     """
     query = state["query"]
     query_type = state["query_type"]
     target_regulations = state["target_regulations"]
-    retry_count = state.get("retry_count", 0)
+    embedding = state.get("query_embedding") or None
 
     # Choose retrieval strategy based on query type
-    if query_type == "LOOKUP" and len(target_regulations) == 1:
+    if query_type is QueryType.LOOKUP and len(target_regulations) == 1:
         # LOOKUP with a specific regulation mentioned:
         # Filter to just that regulation for precise results.
         # Example: "What does SR 11-7 say about validation?"
         #   -> Only search SR 11-7 chunks, return 5 results
-        results = similarity_search(
+        results, context = await asimilarity_search_with_context(
             query=query,
             k=5,
+            context_k=CONTEXT_K,
             filter_dict={"regulation": target_regulations[0]},
+            embedding=embedding,
         )
 
-    elif query_type == "COMPARE" and len(target_regulations) >= 2:
+    elif query_type is QueryType.COMPARE and len(target_regulations) >= 2:
         # COMPARE with specific regulations mentioned:
-        # Search EACH regulation separately so both sides are represented.
+        # Keep each regulation represented so both sides are covered.
         # Without this, one regulation can dominate the results.
+        # One filtered search covers all of them (no per-regulation loop).
         # Example: "How do SR 11-7 and NIST differ?"
         #   -> Get 5 chunks from SR 11-7 + 5 chunks from NIST
-        results = []
         per_regulation = max(5, 10 // len(target_regulations))
-        for reg in target_regulations:
-            reg_results = similarity_search(
-                query=query,
-                k=per_regulation,
-                filter_dict={"regulation": reg},
-            )
-            results.extend(reg_results)
-
-    elif query_type == "COMPARE":
+        results = await asimilarity_search_multi(
+            query=query,
+            k_per_reg=per_regulation,
+            regulations=target_regulations,
+            embedding=embedding,
+        )
+        # Every regulation must stay in the prompt, so no MMR here
+        context = results
+
+    elif query_type is QueryType.COMPARE:
         # COMPARE without specific regulations: broad search
-        results = similarity_search(query=query, k=10)
+        results, context = await asimilarity_search_with_context(
+            query=query, k=10, context_k=CONTEXT_K, embedding=embedding
+        )
 
     else:
         # CHECKLIST, EXPLAIN, or LOOKUP without a specific regulation:
         # General search, moderate number of results.
-        results = similarity_search(query=query, k=7)
-
-    # On retry (if compliance checker found low confidence),
-    # broaden the search to get more diverse results.
-    if retry_count > 0 and len(results) < 3:
-        results = similarity_search(query=query, k=10)
+        results, context = await asimilarity_search_with_context(
+            query=query, k=7, context_k=CONTEXT_K, embedding=embedding
+        )
 
-    state["retrieved_docs"] = results
-    state["retry_count"] = retry_count + 1
+    state["retrieved_docs"] = _dedupe(results)
+    state["context_docs"] = _dedupe(context)
+    state["retry_count"] = state.get("retry_count", 0) + 1
 
     return state
+
+
+async def wide_retriever_agent(state: AgentState) -> dict:
+    """
+    Speculatively fetch a broader set of passages for a possible retry.
+
+    Runs in parallel with the Synthesizer, so on the happy path it costs
+    no extra wall-clock time. If the Compliance Checker then reports low
+    confidence, the retry uses these passages straight away (see
+    use_wide_docs) instead of searching again.
+
+    A failed search only means there is nothing to retry with: it is
+    logged and an empty list is returned, so the main answer still goes
+    out.
+
+    Input state needs: query, query_embedding
+    Output state adds: retrieved_docs_wide
+    """
+    # No regulation filter and a larger k: broaden the search to get
+    # more diverse results than the first, targeted pass.
+    try:
+        results = await asimilarity_search(
+            query=state["query"],
+            k=15,
+            embedding=state.get("query_embedding") or None,
+        )
+    except Exception:
+        logger.exception("Wide retrieval failed; low-confidence answers won't be retried")
+        return {"retrieved_docs_wide": []}
+    return {"retrieved_docs_wide": _dedupe(results)}
+
+
+def use_wide_docs(state: AgentState) -> dict:
+    """
+    Retry step: swap in the passages fetched by wide_retriever_agent.
+
+    Input state needs: retrieved_docs_wide
+    Output state adds: retrieved_docs, context_docs, increments retry_count
+    """
+    # The retry is about giving the Synthesizer more to work with, so it
+    # sees the whole wide set
+    return {
+        "retrieved_docs": state["retrieved_docs_wide"],
+        "context_docs": state["retrieved_docs_wide"],
+        "retry_count": state.get("retry_count", 0) + 1,
+    }
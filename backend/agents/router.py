@@ -7,19 +7,27 @@ and determines:
 2. Which specific REGULATION(S) the question is about
 
 This information helps the Retriever agent decide how to search.
+
+Most questions are classified locally by a few keyword patterns, with no
+LLM call at all. Only questions the patterns can't settle (none of them
+match, or two conflicting ones do) go to gpt-4o-mini.
 """
 
+import asyncio
 import logging
+import os
+import re
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
-from agents.state import AgentState
+from agents.state import AgentState, QueryType
+from http_clients import get_async_http_client, get_http_client
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# We use gpt-4o-mini for routing because:
+# For questions the local patterns can't classify, we use gpt-4o-mini because:
 # - Classification is a simple task, doesn't need the full gpt-4o
 # - gpt-4o-mini is ~20x cheaper and much faster
 # - Accuracy is more than sufficient for 4-way classification
@@ -29,7 +37,12 @@ _llm = None
 def get_llm():
     global _llm
     if _llm is None:
-        _llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        _llm = ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=0,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
     return _llm
 
 # All regulations we know about. Used to detect which ones are mentioned.
@@ -62,62 +75,163 @@ Question: {query}
 Respond with ONLY the category name (LOOKUP, COMPARE, CHECKLIST, or EXPLAIN).
 Nothing else."""
 
+# Question-word patterns for the local classifier
+COMPARE_RE = re.compile(r"\b(compare|vs\.?|versus|differ|differences?)\b", re.IGNORECASE)
+CHECKLIST_RE = re.compile(r"\b(checklist|steps?|requirements?|what do i need|how do i comply)\b", re.IGNORECASE)
+EXPLAIN_RE = re.compile(r"\b(what is|define|explain|meaning of)\b", re.IGNORECASE)
+
+# Set ROUTER_SHADOW_LLM=1 to also ask the LLM about locally classified
+# questions and log how often the two agree (the LLM is never used for
+# the answer, only for the comparison). The comparison runs in the
+# background, so answers don't wait for it.
+ROUTER_SHADOW_LLM = os.getenv("ROUTER_SHADOW_LLM") == "1"
+_shadow_stats = {"checked": 0, "agreed": 0}
+
+# Running comparisons. The event loop only keeps weak references to
+# tasks, so they are held here until they finish.
+_shadow_tasks: set[asyncio.Task] = set()
+
+
+# Map of regulation name -> regex that identifies it in a question.
+# The patterns tolerate the spacing and punctuation variants people type:
+# "SR 11-7", "SR11-7", "sr 1107", "SR 11 7" all match SR 11-7. Word
+# boundaries stop short keywords from matching inside other words
+# (e.g. "nist" inside "administrative").
+REGULATION_PATTERNS = {
+    "SR 11-7": r"\bsr\s*11[-\s]?0?7\b",
+    "NIST AI RMF": r"\bnist\b|\bai\s*rmf\b|\bai\s*100(?:-1)?\b",
+    "ISO 42001": r"\biso(?:/iec)?\s*42001\b",
+    "NAIC Model Bulletin": r"\bnaic\b|\bmodel\s+bulletin\b",
+    "Colorado SB21-169": r"\bcolorado\b|\bsb\s*21-?169\b",
+}
+
+
+def _compile_regulation_pattern() -> tuple[re.Pattern, dict[str, str]]:
+    """
+    Compile every regulation's pattern into one case-insensitive alternation.
+
+    Each regulation gets its own named group (g0, g1, ...) so a match can
+    be mapped back to its regulation through the returned dict.
+    """
+    groups = {}
+    alternatives = []
+    for regulation, pattern in REGULATION_PATTERNS.items():
+        group = f"g{len(groups)}"
+        groups[group] = regulation
+        alternatives.append(f"(?P<{group}>{pattern})")
+    return re.compile("|".join(alternatives), re.IGNORECASE), groups
+
+
+# Built once at import time, so each query is a single regex scan
+_REGULATION_PATTERN, _REGULATION_GROUPS = _compile_regulation_pattern()
+
 
 def detect_regulations(query: str) -> list[str]:
     """
-    Simple keyword detection to find which regulations are mentioned.
+    Simple pattern matching to find which regulations are mentioned.
 
-    We check for variations of each regulation name. For example,
-    "SR 11-7" might appear as "SR11-7", "SR 11-7", or "sr 11-7".
+    A single pass of the precompiled pattern over the query collects
+    every regulation that is mentioned.
 
     Returns a list like ["SR 11-7"] or ["SR 11-7", "NIST AI RMF"].
     Empty list if no specific regulation is mentioned.
     """
-    query_lower = query.lower()
-    found = []
-
-    # Map of keyword patterns -> regulation name
-    patterns = {
-        "SR 11-7": ["sr 11-7", "sr11-7", "sr1107", "sr 1107"],
-        "NIST AI RMF": ["nist", "ai rmf", "ai 100-1", "ai100"],
-        "ISO 42001": ["iso 42001", "iso42001"],
-        "NAIC Model Bulletin": ["naic", "model bulletin"],
-        "Colorado SB21-169": ["colorado", "sb21-169", "sb 21-169", "sb21169"],
+    mentioned = {
+        _REGULATION_GROUPS[match.lastgroup]
+        for match in _REGULATION_PATTERN.finditer(query)
     }
 
-    for regulation, keywords in patterns.items():
-        for keyword in keywords:
-            if keyword in query_lower:
-                found.append(regulation)
-                break  # Found this regulation, move to next
+    # Keep a stable order (the order of REGULATION_PATTERNS)
+    return [regulation for regulation in REGULATION_PATTERNS if regulation in mentioned]
+
+
+def _classify_local(query: str, regulations: list[str]) -> QueryType | None:
+    """
+    Classify the query with keyword patterns, without calling the LLM.
+
+    - Comparison words ("differ", "vs", "compare") always mean COMPARE
+    - Otherwise, if exactly one of the CHECKLIST / EXPLAIN patterns
+      matches, that is the type
+    - If neither matches but the question names a regulation, it is a
+      LOOKUP ("What does SR 11-7 say about validation?")
+
+    Returns None when the patterns can't decide, so the caller falls
+    back to the LLM.
+    """
+    if COMPARE_RE.search(query):
+        return QueryType.COMPARE
+
+    is_checklist = CHECKLIST_RE.search(query) is not None
+    is_explain = EXPLAIN_RE.search(query) is not None
+
+    if is_checklist and not is_explain:
+        return QueryType.CHECKLIST
+    if is_explain and not is_checklist:
+        return QueryType.EXPLAIN
+    if not is_checklist and not is_explain and regulations:
+        return QueryType.LOOKUP
+    return None
 
-    return found
 
+async def _classify_llm(query: str) -> QueryType:
+    """Classify the query type with gpt-4o-mini."""
+    prompt = CLASSIFICATION_PROMPT.format(query=query)
+    response = await get_llm().ainvoke(prompt)
+    answer = response.content.strip().upper()
 
-def router_agent(state: AgentState) -> AgentState:
+    # Validate — if the LLM returns something unexpected, default to EXPLAIN
+    try:
+        return QueryType(answer)
+    except ValueError:
+        logger.warning("LLM returned unexpected query type '%s', defaulting to EXPLAIN", answer)
+        return QueryType.EXPLAIN
+
+
+async def _log_shadow_agreement(query: str, local_type: QueryType) -> None:
+    """Compare a local classification against the LLM's and log the running rate."""
+    try:
+        llm_type = await _classify_llm(query)
+    except Exception:
+        logger.exception("Router shadow classification failed")
+        return
+
+    _shadow_stats["checked"] += 1
+    if llm_type == local_type:
+        _shadow_stats["agreed"] += 1
+    else:
+        logger.info("Router disagreement on %r: local=%s, llm=%s", query, local_type, llm_type)
+
+    logger.info(
+        "Router local/LLM agreement: %d/%d",
+        _shadow_stats["agreed"], _shadow_stats["checked"],
+    )
+
+
+async def router_agent(state: AgentState) -> dict:
     """
     Classify the query and detect target regulations.
 
+    Returns only the keys it sets — LangGraph merges them into the
+    shared state.
+
     Input state needs: query
     Output state adds: query_type, target_regulations
     """
     query = state["query"]
 
-    # Step 1: Classify the query type using the LLM
-    prompt = CLASSIFICATION_PROMPT.format(query=query)
-    response = get_llm().invoke(prompt)
-    query_type = response.content.strip().upper()
-
-    # Validate — if the LLM returns something unexpected, default to EXPLAIN
-    valid_types = {"LOOKUP", "COMPARE", "CHECKLIST", "EXPLAIN"}
-    if query_type not in valid_types:
-        logger.warning("LLM returned unexpected query type '%s', defaulting to EXPLAIN", query_type)
-        query_type = "EXPLAIN"
-
-    # Step 2: Detect which regulations are mentioned (no LLM needed, just keywords)
+    # Step 1: Detect which regulations are mentioned (no LLM needed, just patterns)
     target_regulations = detect_regulations(query)
 
-    state["query_type"] = query_type
-    state["target_regulations"] = target_regulations
-
-    return state
+    # Step 2: Classify the query type, locally if the patterns are sure
+    query_type = _classify_local(query, target_regulations)
+    if query_type is None:
+        query_type = await _classify_llm(query)
+    elif ROUTER_SHADOW_LLM:
+        task = asyncio.create_task(_log_shadow_agreement(query, query_type))
+        _shadow_tasks.add(task)
+        task.add_done_callback(_shadow_tasks.discard)
+
+    return {
+        "query_type": query_type,
+        "target_regulations": tuple(target_regulations),
+    }
@@ -9,25 +9,55 @@ It gets passed through the LangGraph pipeline:
 Each agent reads what it needs and adds its own output.
 """
 
+from enum import StrEnum
 from typing import TypedDict
 
 
+class QueryType(StrEnum):
+    """
+    The four kinds of question the Router can detect.
+
+    Members are interned singletons, so comparisons between them are
+    identity checks, and as a StrEnum each one still formats as its name
+    ("LOOKUP") in prompts and API responses.
+    """
+
+    LOOKUP = "LOOKUP"
+    COMPARE = "COMPARE"
+    CHECKLIST = "CHECKLIST"
+    EXPLAIN = "EXPLAIN"
+
+
 class AgentState(TypedDict):
     # The user's original question (set at the start, never changes)
     query: str
 
     # What type of question is this? Set by the Router agent.
-    # One of: "LOOKUP", "COMPARE", "CHECKLIST", "EXPLAIN"
-    query_type: str
+    # One of QueryType.LOOKUP, COMPARE, CHECKLIST, EXPLAIN
+    query_type: QueryType
 
     # Which specific regulation(s) the question is about. Set by the Router.
-    # e.g., ["SR 11-7"] or ["SR 11-7", "NIST AI RMF"] or [] if general
-    target_regulations: list[str]
+    # e.g., ("SR 11-7",) or ("SR 11-7", "NIST AI RMF") or () if general.
+    # A tuple, since it is never modified after routing.
+    target_regulations: tuple[str, ...]
+
+    # Embedding of the query, computed once by ask_question() (it is also
+    # the response cache key) and reused by every vector search.
+    query_embedding: list[float]
 
     # The relevant document chunks found by the Retriever agent.
     # Each item is a LangChain Document object with .page_content and .metadata
     retrieved_docs: list
 
+    # A smaller, de-duplicated subset of retrieved_docs (picked with MMR)
+    # that the Synthesizer writes its answer from. The Compliance Checker
+    # still verifies against all of retrieved_docs.
+    context_docs: list
+
+    # A broader set of chunks fetched in parallel with the Synthesizer.
+    # Used as retrieved_docs if the Compliance Checker asks for a retry.
+    retrieved_docs_wide: list
+
     # The generated answer. Set by the Synthesizer agent.
     answer: str
 
@@ -35,6 +65,6 @@ class AgentState(TypedDict):
     # Contains: {"claims": [...], "confidence": 0.0-1.0, "summary": "..."}
     verification: dict
 
-    # How many times we've retried retrieval (max 2).
-    # If confidence is low, we retry with different parameters.
+    # How many retrievals have run: 1 after the Retriever, 2 after a retry.
+    # If confidence is low, we retry once with the broader retrieved_docs_wide.
     retry_count: int
@@ -7,14 +7,41 @@ well-cited answer. The response style adapts based on the query type:
 - COMPARE -> structured comparison with bullet points
 - CHECKLIST -> numbered requirements list
 - EXPLAIN -> thorough explanation
+
+stream_answer() yields the answer token by token, so the graph can start
+verifying early sentences while later ones are still being generated.
+
+Extractive fast path: when a LOOKUP question's best passage is a very
+close match from the requested regulation, that passage already is the
+answer. Its whole sentences are returned with a citation and gpt-4o is
+skipped.
+The Compliance Checker still verifies it, and a low score sends the
+retry (which always uses the LLM) through the usual loop.
 """
 
+import os
+import re
+from collections.abc import AsyncIterator
+
 from dotenv import load_dotenv
+from langchain_core.globals import get_llm_cache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, convert_to_messages
+from langchain_core.outputs import ChatGeneration
 from langchain_openai import ChatOpenAI
-from agents.state import AgentState
+from agents.compliance_checker import SENTENCE_BOUNDARY
+from agents.state import AgentState, QueryType
+from http_clients import get_async_http_client, get_http_client
 
 load_dotenv()
 
+# Answers are kept out of the shared LLM cache (see graph.py) unless
+# CACHE_SYNTHESIZER=1. Re-generating keeps answers fresh after prompt or
+# corpus changes; caching them saves the most expensive call on repeats.
+# Streaming bypasses LangChain's cache, so stream_answer() reads and
+# writes it itself.
+CACHE_SYNTHESIZER = os.getenv("CACHE_SYNTHESIZER") == "1"
+
 # We use gpt-4o here (not mini) because answer quality matters.
 # This is the user-facing output — it needs to be accurate and well-written.
 _llm = None
@@ -23,9 +50,29 @@ _llm = None
 def get_llm():
     global _llm
     if _llm is None:
-        _llm = ChatOpenAI(model="gpt-4o", temperature=0)
+        _llm = ChatOpenAI(
+            model="gpt-4o",
+            temperature=0,
+            # None = use the global LLM cache, False = always call OpenAI
+            cache=None if CACHE_SYNTHESIZER else False,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        )
     return _llm
 
+# Minimum relevance score (cosine similarity, see ingestion/retriever.py)
+# of the top passage for the extractive fast path. text-embedding-3-small
+# scores are compressed: most question-to-passage matches land between
+# 0.3 and 0.6, and only a passage that restates the question clears
+# ~0.65. Below this the passage may only partly answer the question.
+# Tune it with EXTRACTIVE_THRESHOLD against the scores your own LOOKUP
+# questions get.
+EXTRACTIVE_SCORE_THRESHOLD = float(os.getenv("EXTRACTIVE_THRESHOLD", "0.65"))
+
+# A chunk is cut at a fixed size, so it can start and end mid-sentence
+_SENTENCE_START = re.compile(r"^[A-Z\[(\"']")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*$")
+
 SYSTEM_PROMPT = """You are a regulatory compliance expert specializing in AI and model risk management.
 
 Your task: Answer the user's question using ONLY the provided source documents.
@@ -62,45 +109,134 @@ def format_context(docs: list) -> str:
 
     This format makes it easy for the LLM to cite specific sources.
     """
-    formatted = []
-    for doc in docs:
-        regulation = doc.metadata.get("regulation", "Unknown")
-        page = doc.metadata.get("page", "?")
-        text = doc.page_content
-
-        formatted.append(f"[Source: {regulation} | Page {page}]\n{text}")
-
-    return "\n\n---\n\n".join(formatted)
-
-
-def synthesizer_agent(state: AgentState) -> AgentState:
-    """
-    Generate an answer with citations from the retrieved documents.
+    return "\n\n---\n\n".join(
+        f"[Source: {doc.metadata.get('regulation', 'Unknown')} | "
+        f"Page {doc.metadata.get('page', '?')}]\n{doc.page_content}"
+        for doc in docs
+    )
 
-    Input state needs: query, query_type, retrieved_docs
-    Output state adds: answer
-    """
-    query = state["query"]
-    query_type = state["query_type"]
-    docs = state["retrieved_docs"]
 
-    # Format retrieved chunks into a readable context string
-    context = format_context(docs)
+def build_messages(state: AgentState) -> list[dict]:
+    """Build the chat messages for the question and retrieved documents."""
+    # Format the chunks picked for the prompt into a readable context string
+    context = format_context(state.get("context_docs") or state["retrieved_docs"])
 
     # Build the prompt
     user_message = USER_PROMPT.format(
-        query_type=query_type,
+        query_type=state["query_type"],
         context=context,
-        query=query,
+        query=state["query"],
     )
 
-    # Call the LLM
-    messages = [
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_message},
     ]
 
-    response = get_llm().invoke(messages)
-    state["answer"] = response.content
 
-    return state
+def extractive_answer(state: AgentState) -> str | None:
+    """
+    Return the top passage as the answer, if it can stand in for one.
+
+    Only applies on the first attempt of a LOOKUP question about one
+    regulation, when the top passage comes from that regulation and
+    scores at least EXTRACTIVE_SCORE_THRESHOLD. Returns None otherwise,
+    or if the passage holds no whole sentence.
+    """
+    docs = state["retrieved_docs"]
+    regulations = state.get("target_regulations", ())
+
+    if state["query_type"] is not QueryType.LOOKUP or len(regulations) != 1:
+        return None
+    if not docs or state.get("retry_count", 0) > 1:
+        return None
+
+    top = docs[0]
+    if top.metadata.get("regulation") != regulations[0]:
+        return None
+    if top.metadata.get("score", 0.0) < EXTRACTIVE_SCORE_THRESHOLD:
+        return None
+
+    # PDF text has hard line breaks mid-sentence; join it back into
+    # running text so the claims split into whole sentences
+    text = _whole_sentences(" ".join(top.page_content.split()))
+    if not text:
+        return None
+
+    # Cite inline, the same way the LLM is asked to
+    page = top.metadata.get("page", "?")
+    return f"{text} [Source: {regulations[0]}, Page {page}]"
+
+
+def _whole_sentences(text: str) -> str:
+    """
+    Drop a sentence fragment from the start and end of a passage.
+
+    Example:
+        "of the model. Validation must be independent. Staff should"
+        -> "Validation must be independent."
+    """
+    sentences = SENTENCE_BOUNDARY.split(text.strip())
+    if sentences and not _SENTENCE_START.match(sentences[0]):
+        sentences.pop(0)
+    if sentences and not _SENTENCE_END.search(sentences[-1]):
+        sentences.pop()
+    return " ".join(sentences)
+
+
+def _cache_key(messages: list[dict]) -> tuple[str, str]:
+    """The (prompt, llm_string) pair ChatOpenAI uses as its cache key."""
+    return dumps(convert_to_messages(messages)), get_llm()._get_llm_string()
+
+
+async def stream_answer(state: AgentState) -> AsyncIterator[str]:
+    """
+    Stream the answer as it is generated, one text chunk at a time.
+
+    With CACHE_SYNTHESIZER=1, a cached answer is yielded in one chunk.
+
+    Input state needs: query, query_type, retrieved_docs, context_docs
+    """
+    answer = extractive_answer(state)
+    if answer is not None:
+        yield answer
+        return
+
+    messages = build_messages(state)
+
+    cache = get_llm_cache() if CACHE_SYNTHESIZER else None
+    if cache is not None:
+        prompt, llm_string = _cache_key(messages)
+        cached = await cache.alookup(prompt, llm_string)
+        if cached:
+            yield cached[0].text
+            return
+
+    answer = ""
+    async for chunk in get_llm().astream(messages):
+        if chunk.content:
+            answer += chunk.content
+            yield chunk.content
+
+    if cache is not None:
+        generation = ChatGeneration(message=AIMessage(content=answer))
+        await cache.aupdate(prompt, llm_string, [generation])
+
+
+async def synthesizer_agent(state: AgentState) -> dict:
+    """
+    Generate an answer with citations from the retrieved documents.
+
+    Returns only the key it sets — LangGraph merges it into the shared
+    state.
+
+    Input state needs: query, query_type, retrieved_docs, context_docs
+    Output state adds: answer
+    """
+    answer = extractive_answer(state)
+    if answer is not None:
+        return {"answer": answer}
+
+    response = await get_llm().ainvoke(build_messages(state))
+
+    return {"answer": response.content}
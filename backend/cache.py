@@ -0,0 +1,209 @@
+"""
+Semantic response cache for the Q&A pipeline.
+
+Users often ask the same question twice, or rephrase it slightly
+("What does SR 11-7 say about validation?" vs "SR 11-7 validation
+requirements?"). Running all four agents again for those is slow and
+costs four LLM calls, so we remember recent answers keyed by the
+embedding of the question.
+
+Lookups come in two tiers:
+- lookup_exact() finds a byte-identical question (after lowercasing and
+  collapsing whitespace) in a dict, before the question is even embedded
+- lookup() handles everything else by embedding similarity:
+
+How a similarity lookup works:
+- The question embedding is compared (cosine similarity) against every
+  cached question embedding in one vectorized numpy operation
+- If the best match is above the threshold (0.95 by default) and hasn't
+  expired, the stored response is returned and the pipeline is skipped
+
+Each entry also gets an ETag (a hash of the stored response), so the API
+can answer a client that already has the answer with 304 Not Modified.
+
+Entries expire after a TTL, and the least recently used entry is evicted
+once the cache is full. Everything lives in process memory — a restart
+starts with an empty cache.
+"""
+
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+import orjson
+
+
+class SemanticCache:
+    """In-memory cache of pipeline responses keyed by question embedding."""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1024,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        # entry id -> (normalized embedding, response dict, expires_at,
+        # question key, ETag). Ordered from least to most recently used.
+        self._entries: OrderedDict[
+            int, tuple[np.ndarray, dict, float, str | None, str]
+        ] = OrderedDict()
+        self._next_id = 0
+
+        # Normalized question text -> entry id, for exact-match lookups
+        self._by_question: dict[str, int] = {}
+
+        # Stacked embeddings for vectorized search, rebuilt lazily
+        # whenever entries are added or removed.
+        self._matrix: np.ndarray | None = None
+        self._matrix_ids: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup_exact(self, question: str) -> dict | None:
+        """
+        Return the cached response for this exact question, or None.
+
+        Case and whitespace are ignored. This is a dict lookup, so it is
+        tried before the question is embedded.
+        """
+        entry_id = self._live_question_entry(question)
+        if entry_id is None:
+            return None
+
+        self._entries.move_to_end(entry_id)  # Mark as recently used
+        return copy.deepcopy(self._entries[entry_id][1])
+
+    def etag(self, question: str) -> str | None:
+        """
+        Return the ETag of the cached answer to this exact question.
+
+        Returns None if the question isn't cached (or was only matched by
+        similarity). Cheaper than lookup_exact(): nothing is copied.
+        """
+        entry_id = self._live_question_entry(question)
+        return None if entry_id is None else self._entries[entry_id][4]
+
+    def lookup(self, embedding: list[float]) -> dict | None:
+        """
+        Return a cached response for a semantically similar question.
+
+        Returns None on a miss. The returned dict is a copy, so callers
+        can modify it without corrupting the cache.
+        """
+        self._evict_expired()
+        if not self._entries:
+            return None
+
+        matrix, ids = self._search_matrix()
+        scores = matrix @ _normalize(embedding)
+        best = int(np.argmax(scores))
+
+        if scores[best] < self.threshold:
+            return None
+
+        entry_id = ids[best]
+        self._entries.move_to_end(entry_id)  # Mark as recently used
+        return copy.deepcopy(self._entries[entry_id][1])
+
+    def store(
+        self,
+        embedding: list[float],
+        response: dict,
+        question: str | None = None,
+    ) -> str:
+        """
+        Cache a response, evicting the least recently used entry if full.
+
+        Pass the question text to make the entry findable by lookup_exact().
+        Returns the entry's ETag (see response_etag).
+        """
+        key = _question_key(question) if question is not None else None
+        if key in self._by_question:
+            self._remove(self._by_question[key])  # Replace the older answer
+
+        expires_at = time.monotonic() + self.ttl_seconds
+        etag = response_etag(response)
+        self._entries[self._next_id] = (
+            _normalize(embedding),
+            copy.deepcopy(response),
+            expires_at,
+            key,
+            etag,
+        )
+        if key is not None:
+            self._by_question[key] = self._next_id
+        self._next_id += 1
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        self._matrix = None
+        return etag
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        self._entries.clear()
+        self._by_question.clear()
+        self._matrix = None
+
+    def _live_question_entry(self, question: str) -> int | None:
+        """Entry id for this question if it is cached and not expired."""
+        entry_id = self._by_question.get(_question_key(question))
+        if entry_id is None:
+            return None
+
+        if self._entries[entry_id][2] <= time.monotonic():
+            self._remove(entry_id)
+            self._matrix = None
+            return None
+
+        return entry_id
+
+    def _remove(self, entry_id: int) -> None:
+        key = self._entries.pop(entry_id)[3]
+        if key is not None:
+            del self._by_question[key]
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [i for i, entry in self._entries.items() if entry[2] <= now]
+        for entry_id in expired:
+            self._remove(entry_id)
+        if expired:
+            self._matrix = None
+
+    def _search_matrix(self) -> tuple[np.ndarray, list[int]]:
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.vstack([self._entries[i][0] for i in self._matrix_ids])
+        return self._matrix, self._matrix_ids
+
+
+def _question_key(question: str) -> str:
+    """Lowercase and collapse whitespace, so trivial variations still match."""
+    return " ".join(question.lower().split())
+
+
+def response_etag(response: dict) -> str:
+    """
+    Weak ETag for a response: a hash of its content.
+
+    Weak because a cache hit adds a "cache": "hit" flag to the body; the
+    answer itself is the same.
+    """
+    digest = hashlib.sha256(orjson.dumps(response, option=orjson.OPT_SORT_KEYS))
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    """Scale to unit length so a dot product equals cosine similarity."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
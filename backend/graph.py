@@ -2,76 +2,194 @@
 LangGraph workflow — wires all agents together into a pipeline.
 
 The flow:
-  Router -> Retriever -> Synthesizer -> Compliance Checker
-                ^                              |
-                |______ retry if confidence < 0.7 (max 2 retries)
+  Router ----------------+
+                         +-> Retriever -+-> Synthesizer + Compliance Checker -+-> review
+  [embed + cache lookup] +              |                                     |      |
+                                        +-> Wide Retriever -------------------+      |
+                                                                                     |
+          retry once if confidence < 0.7: Use Wide Docs -> Synthesizer + Checker <---+
+
+The Router runs before the graph starts, alongside embedding the question
+and the response cache lookup (see _prepare), so a Router LLM call
+overlaps with the embedding call instead of following it.
+
+The Synthesizer and Compliance Checker run as one pipelined step: the
+answer is streamed, and batches of finished sentences are verified while
+the rest is still being generated (see synthesize_and_verify).
+
+The Wide Retriever runs in parallel with that step and fetches a broader
+set of passages. A retry swaps those in and goes straight back to the
+Synthesizer, so it needs no second search.
 
 This file is the "main brain" of the system. It:
 1. Defines the graph (which agent connects to which)
 2. Adds a conditional retry loop for low-confidence answers
-3. Provides the ask_question() function that the API will call
+3. Provides the ask_question() function that the API will call, and
+   ask_question_stream(), which also streams the answer as it's written
+
+ask_question() embeds the question once, up front. That embedding is the
+key for the semantic response cache (a hit skips all four agents), and on
+a miss it is passed to the Retriever so the query is never embedded twice.
 """
 
+import asyncio
+
+import os
+from collections.abc import AsyncIterator
+from pathlib import Path
+
 from dotenv import load_dotenv
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 
 from agents.state import AgentState
 from agents.router import router_agent
-from agents.retriever import retriever_agent
-from agents.synthesizer import synthesizer_agent
-from agents.compliance_checker import compliance_checker_agent
+from agents.retriever import retriever_agent, use_wide_docs, wide_retriever_agent
+from agents.synthesizer import stream_answer
+from agents.compliance_checker import verify_answer_stream
+from cache import SemanticCache, response_etag
+from ingestion.retriever import aembed_query
 
 load_dotenv()
 
+# Exact-match cache for LLM calls, shared by every ChatOpenAI instance.
+# The Router and Compliance Checker run at temperature=0 and see the same
+# prompts over and over, so identical prompts are answered from SQLite
+# instead of another OpenAI round-trip. The Synthesizer opts out unless
+# CACHE_SYNTHESIZER=1 (see agents/synthesizer.py).
+# The file holds prompts and answers, so keep it out of images and
+# commits; LLM_CACHE_PATH moves it (e.g. to a volume).
+LLM_CACHE_PATH = Path(
+    os.getenv("LLM_CACHE_PATH", Path(__file__).resolve().parent / "llm_cache.db")
+)
+
+
+def enable_llm_cache() -> None:
+    """
+    Open the SQLite LLM cache and use it for every LLM call.
+
+    Called by the server at startup rather than on import, so tests and
+    scripts that import the pipeline don't create the cache file.
+    """
+    set_llm_cache(SQLiteCache(database_path=str(LLM_CACHE_PATH)))
+
+# Answers below this confidence trigger a retry, and are never cached.
+CONFIDENCE_THRESHOLD = 0.7
+
+# Recent answers, keyed by question embedding (see cache.py).
+# CACHE_THRESHOLD is the cosine similarity a question needs to reuse an
+# answer, CACHE_TTL how long answers are kept (seconds), and CACHE_MAX how
+# many are kept before the least recently used one is evicted.
+response_cache = SemanticCache(
+    threshold=float(os.getenv("CACHE_THRESHOLD", "0.95")),
+    ttl_seconds=float(os.getenv("CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("CACHE_MAX", "1024")),
+)
+
 
 def should_retry(state: AgentState) -> str:
     """
     Decide whether to retry retrieval or finish.
 
-    Called after the Compliance Checker. If confidence is below 0.7
-    and we haven't retried too many times, go back to the Retriever
-    for another attempt with potentially different results.
+    Called once the answer is verified and the Wide Retriever is done.
+    If confidence is below 0.7, swap in the broader passages from the
+    Wide Retriever and synthesize again. There is no retry if the wide
+    search found nothing, and never a second one (see build_graph): it
+    would only rewrite the answer from the same passages.
 
     Returns:
-        "retry" -> go back to retriever
+        "retry" -> use the wide docs and synthesize once more
         "end"   -> we're done, return the answer
     """
     confidence = state.get("verification", {}).get("confidence", 1.0)
-    retry_count = state.get("retry_count", 0)
 
-    if confidence < 0.7 and retry_count <= 2:
+    if confidence < CONFIDENCE_THRESHOLD and state.get("retrieved_docs_wide"):
         return "retry"
     return "end"
 
 
+def review(state: AgentState) -> dict:
+    """
+    Join point for the answer and the speculative wide search.
+
+    Does nothing itself. A conditional edge only sees the writes of the
+    node it leaves, so should_retry hangs off this node, which runs once
+    both branches have finished.
+    """
+    return {}
+
+
+async def _forward_tokens(chunks: AsyncIterator[str], writer) -> AsyncIterator[str]:
+    """Pass answer chunks through, also handing each one to the stream writer."""
+    async for chunk in chunks:
+        writer({"token": chunk})
+        yield chunk
+
+
+async def synthesize_and_verify(state: AgentState) -> dict:
+    """
+    Run the Synthesizer and the Compliance Checker as a pipeline.
+
+    The Synthesizer's answer is streamed straight into the Compliance
+    Checker, which verifies each batch of finished claims while later
+    sentences are still being generated. This hides most of the
+    verification time behind generation.
+
+    When the graph is run with stream_mode="custom" (see
+    ask_question_stream), every answer chunk is also sent to the caller
+    as it is generated.
+
+    Input state needs: query, query_type, retrieved_docs
+    Output state adds: answer, verification
+    """
+    answer, verification = await verify_answer_stream(
+        _forward_tokens(stream_answer(state), get_stream_writer()),
+        state["retrieved_docs"],
+    )
+    return {"answer": answer, "verification": verification}
+
+
 def build_graph() -> StateGraph:
     """
     Build and compile the LangGraph workflow.
 
-    The graph has 4 nodes (one per agent) and edges connecting them.
-    The key feature is the conditional edge after compliance_checker:
-    it either ends or loops back to the retriever.
+    The graph has nodes for the Retriever, the pipelined Synthesizer +
+    Compliance Checker step, the speculative wide retriever, and the
+    use_wide_docs retry step. The Router has already run (see _prepare).
+    The key feature is the conditional edge after review: it either ends
+    or synthesizes the answer once more from the wider results. The
+    retry runs as its own node (retry_synthesize_and_verify), which always
+    ends, so an answer is never retried twice.
     """
     workflow = StateGraph(AgentState)
 
     # Add each agent as a node in the graph
-    workflow.add_node("router", router_agent)
     workflow.add_node("retriever", retriever_agent)
-    workflow.add_node("synthesizer", synthesizer_agent)
-    workflow.add_node("compliance_checker", compliance_checker_agent)
+    workflow.add_node("wide_retriever", wide_retriever_agent)
+    workflow.add_node("use_wide_docs", use_wide_docs)
+    workflow.add_node("synthesize_and_verify", synthesize_and_verify)
+    workflow.add_node("review", review)
+    workflow.add_node("retry_synthesize_and_verify", synthesize_and_verify)
 
-    # Define the flow: router -> retriever -> synthesizer -> compliance_checker
-    workflow.set_entry_point("router")
-    workflow.add_edge("router", "retriever")
-    workflow.add_edge("retriever", "synthesizer")
-    workflow.add_edge("synthesizer", "compliance_checker")
+    # Define the flow: retriever -> synthesize_and_verify
+    workflow.set_entry_point("retriever")
+    workflow.add_edge("retriever", "synthesize_and_verify")
 
-    # Conditional edge: retry or finish
+    # Speculative branch: runs alongside synthesize_and_verify (a single
+    # search, so it is almost always done first). review waits for both.
+    workflow.add_edge("retriever", "wide_retriever")
+    workflow.add_edge(["synthesize_and_verify", "wide_retriever"], "review")
+
+    # Conditional edge: retry once with the wide docs, or finish
     workflow.add_conditional_edges(
-        "compliance_checker",
+        "review",
         should_retry,
-        {"retry": "retriever", "end": END},
+        {"retry": "use_wide_docs", "end": END},
     )
+    workflow.add_edge("use_wide_docs", "retry_synthesize_and_verify")
+    workflow.add_edge("retry_synthesize_and_verify", END)
 
     return workflow.compile()
 
@@ -87,22 +205,127 @@ def format_sources(docs: list) -> list[dict]:
         sources.append({
             "regulation": doc.metadata.get("regulation", "Unknown"),
             "page": doc.metadata.get("page", 0),
-            "content": doc.page_content[:300],  # Truncate for readability
+            # Short preview stored at ingestion (older stores lack it)
+            "content": doc.metadata.get("preview") or doc.page_content[:300],
         })
     return sources
 
 
-def ask_question(query: str) -> dict:
+def _mark_cache_hit(response: dict) -> tuple[dict, str]:
+    """
+    Tell the client this answer was reused (lookups return a copy).
+
+    Also returns the ETag of the cached entry, taken before the flag is
+    added, like the one stored with it.
+    """
+    etag = response_etag(response)
+    response["verification"]["cache"] = "hit"
+    return response, etag
+
+
+async def _prepare(
+    query: str,
+    use_cache: bool,
+) -> tuple[tuple[dict, str] | None, dict | None]:
+    """
+    Check the response cache, and on a miss route and embed the question.
+
+    The Router runs while the question is embedded and looked up in the
+    cache: both can be OpenAI round-trips (the Router only asks its LLM
+    about ambiguous questions), so they overlap. A cache hit cancels it.
+
+    Returns ((cached response, its ETag), None) on a hit, or (None,
+    initial graph state) on a miss.
+    """
+    # Exact repeats are found without even embedding the question
+    if use_cache and (cached := response_cache.lookup_exact(query)) is not None:
+        return _mark_cache_hit(cached), None
+
+    routing = asyncio.create_task(router_agent({"query": query}))
+    try:
+        # Embed once: the vector is both the cache key and the retrieval query
+        query_embedding = await aembed_query(query)
+
+        if use_cache and (cached := response_cache.lookup(query_embedding)) is not None:
+            routing.cancel()
+            return _mark_cache_hit(cached), None
+
+        route = await routing
+    except BaseException:
+        routing.cancel()
+        raise
+
+    return None, _initial_state(query, query_embedding, route)
+
+
+def _initial_state(query: str, query_embedding: list[float], route: dict) -> dict:
+    """Build the initial state from the question, its embedding and the Router's output."""
+    return {
+        "query": query,
+        "query_type": route["query_type"],
+        "target_regulations": route["target_regulations"],
+        "query_embedding": query_embedding,
+        "retrieved_docs": [],
+        "context_docs": [],
+        "retrieved_docs_wide": [],
+        "answer": "",
+        "verification": {},
+        "retry_count": 0,
+    }
+
+
+def _finish(
+    query: str,
+    query_embedding: list[float],
+    result: dict,
+    cache_answer: bool = True,
+) -> tuple[dict, str | None]:
+    """
+    Package the final state as an API response and cache it if confident.
+
+    Returns the response and the ETag it was cached with (None if it
+    wasn't cached).
+    """
+    response = {
+        "answer": result["answer"],
+        "sources": format_sources(result["retrieved_docs"]),
+        "confidence": result.get("verification", {}).get("confidence", 0),
+        "query_type": str(result["query_type"]),  # Plain string for the API
+        "verification": result.get("verification", {}),
+    }
+
+    # Only reuse answers the Compliance Checker was happy with
+    etag = None
+    if cache_answer and response["confidence"] >= CONFIDENCE_THRESHOLD:
+        etag = response_cache.store(query_embedding, response, question=query)
+
+    return response, etag
+
+
+async def ask_question(
+    query: str,
+    use_cache: bool = True,
+    cache_answer: bool = True,
+) -> dict:
     """
     Main entry point — ask a regulatory question and get an answer.
 
-    This is what the FastAPI endpoint will call. It:
-    1. Creates the initial state with the user's question
-    2. Runs it through the full agent pipeline
-    3. Returns a clean response dict
+    This is what the FastAPI endpoint will await. It is a coroutine
+    (rather than wrapping asyncio.run) so the OpenAI async clients are
+    always used from the server's single event loop. It:
+    1. Checks the response cache: first for the exact same question, then
+       (after embedding it) for a semantically similar one, while the
+       Router classifies the question
+    2. On a miss, creates the initial state with the user's question
+    3. Runs it through the rest of the agent pipeline
+    4. Returns a clean response dict (and caches it if confident)
 
     Args:
         query: The user's question (e.g., "What does SR 11-7 require?")
+        use_cache: False always runs the pipeline (the fresh answer is
+            still cached for later requests)
+        cache_answer: False keeps this answer out of the response cache
+            (e.g. for the startup warmup)
 
     Returns:
         {
@@ -113,25 +336,62 @@ def ask_question(query: str) -> dict:
             "verification": {...}
         }
     """
-    # Build the initial state — only query is set, everything else is empty
-    initial_state = {
-        "query": query,
-        "query_type": "",
-        "target_regulations": [],
-        "retrieved_docs": [],
-        "answer": "",
-        "verification": {},
-        "retry_count": 0,
-    }
+    response, _ = await ask_question_with_etag(query, use_cache, cache_answer)
+    return response
+
+
+async def ask_question_with_etag(
+    query: str,
+    use_cache: bool = True,
+    cache_answer: bool = True,
+) -> tuple[dict, str | None]:
+    """
+    Same as ask_question(), but also returns the answer's ETag.
+
+    The ETag is that of the cache entry this exact response was served
+    from or stored as, or None if it isn't cached (see cache.py).
+    """
+    cached, state = await _prepare(query, use_cache)
+    if cached is not None:
+        return cached
 
     # Run the full pipeline
-    result = app.invoke(initial_state)
+    result = await app.ainvoke(state)
 
-    # Package the response
-    return {
-        "answer": result["answer"],
-        "sources": format_sources(result["retrieved_docs"]),
-        "confidence": result.get("verification", {}).get("confidence", 0),
-        "query_type": result["query_type"],
-        "verification": result.get("verification", {}),
-    }
+    return _finish(query, state["query_embedding"], result, cache_answer)
+
+
+async def ask_question_stream(
+    query: str,
+    use_cache: bool = True,
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming version of ask_question() — yields (event, data) pairs.
+
+    Events, in order:
+      ("token", {"text": "..."})  each piece of the answer as it is written
+      ("retry", {})               confidence was low and the answer is being
+                                  rewritten; discard the tokens so far
+      ("result", {...})           the final response, same as ask_question()
+
+    A cached answer is sent as a single "result" event.
+    """
+    cached, state = await _prepare(query, use_cache)
+    if cached is not None:
+        yield "result", cached[0]
+        return
+
+    final_state = None
+    async for mode, chunk in app.astream(
+        state,
+        stream_mode=["custom", "updates", "values"],
+    ):
+        if mode == "custom":
+            yield "token", {"text": chunk["token"]}
+        elif mode == "updates" and "use_wide_docs" in chunk:
+            yield "retry", {}
+        elif mode == "values":
+            final_state = chunk
+
+    response, _ = _finish(query, state["query_embedding"], final_state)
+    yield "result", response
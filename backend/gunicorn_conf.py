@@ -0,0 +1,39 @@
+"""
+Gunicorn settings for running the API in production.
+
+Run with (from backend/):
+  gunicorn -c gunicorn_conf.py main:app
+
+Gunicorn supervises several Uvicorn worker processes, so the server uses
+every CPU core and a crashed worker is restarted automatically. Each
+worker runs its own event loop (uvloop + httptools, as with plain
+uvicorn), which already handles many questions concurrently.
+
+Set WEB_CONCURRENCY to override the number of workers.
+"""
+
+import multiprocessing
+import os
+
+# One async worker per core. The classic (2 x cores) + 1 rule is for
+# sync workers that block on I/O; ours don't, so extra workers would
+# only add memory and split the response cache further.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Keep idle client connections open briefly so polling clients and
+# proxies can reuse them
+keepalive = 5
+
+# Answers can take a while (several LLM calls plus a possible retry), so
+# don't let gunicorn kill a worker that is busy with a slow question
+timeout = 120
+graceful_timeout = 30
+
+# The app is NOT preloaded in the master process. Each worker imports
+# the app itself and, at startup, opens its own SQLite LLM cache
+# connection, HTTP clients and vector store and runs the warmup (see
+# main.py and warmup.py); none of these may be shared across forks.
+preload_app = False
@@ -0,0 +1,49 @@
+"""
+Shared HTTP clients for every OpenAI call in the backend.
+
+By default each ChatOpenAI / OpenAIEmbeddings instance creates its own
+HTTP client, so the Router, Synthesizer, Compliance Checker and the
+embeddings model each keep a separate connection pool to the same API
+host. Passing them one shared client means a warm keep-alive connection
+is almost always available, and a question never pays for an extra
+TCP + TLS handshake.
+
+Both a sync and an async client are provided because LangChain uses
+whichever matches the call (invoke vs ainvoke). The server closes them
+on shutdown (see close_http_clients).
+"""
+
+from functools import lru_cache
+
+import httpx
+
+# Each question can have several OpenAI requests in flight (verification
+# batches, the embedding, the Router), so keep plenty of idle connections
+# warm for bursts of concurrent questions. Timeouts are left to the
+# OpenAI client, which sets them on every request.
+HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Shared client for synchronous OpenAI calls."""
+    return httpx.Client(limits=HTTP_LIMITS)
+
+
+@lru_cache(maxsize=1)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Shared client for asynchronous OpenAI calls."""
+    return httpx.AsyncClient(limits=HTTP_LIMITS)
+
+
+async def close_http_clients() -> None:
+    """
+    Close the shared clients (if they were ever created).
+
+    Only call this when shutting down: the LLM clients keep references
+    to these and can't make requests afterwards.
+    """
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
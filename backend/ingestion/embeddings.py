@@ -0,0 +1,75 @@
+"""
+Shared embedding model.
+
+Ingestion and retrieval must embed text with the same model, otherwise
+query vectors and stored chunk vectors aren't comparable. Both modules get
+their embeddings client from get_embeddings(), which creates it once per
+process so its HTTP connection pool is reused across queries.
+
+Query embeddings are also kept in a small LRU cache, so asking the same
+question again doesn't cost another OpenAI embedding call.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+from pydantic import PrivateAttr
+
+from http_clients import get_async_http_client, get_http_client
+
+load_dotenv()
+
+# OpenAI's text-embedding-3-small: fast, cheap, 1536-dimensional vectors
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# How many distinct query embeddings to remember (~6KB each)
+QUERY_CACHE_SIZE = 4096
+
+
+class CachedQueryEmbeddings(OpenAIEmbeddings):
+    """
+    OpenAIEmbeddings that remembers recent query embeddings.
+
+    Only embed_query / aembed_query are cached — document embeddings
+    during ingestion are always computed fresh.
+    """
+
+    _query_cache: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+
+    def embed_query(self, text: str) -> list[float]:
+        cached = self._cached(text)
+        if cached is None:
+            cached = self._remember(text, super().embed_query(text))
+        return list(cached)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        cached = self._cached(text)
+        if cached is None:
+            cached = self._remember(text, await super().aembed_query(text))
+        return list(cached)
+
+    def _cached(self, text: str) -> list[float] | None:
+        embedding = self._query_cache.get(text)
+        if embedding is not None:
+            self._query_cache.move_to_end(text)  # Mark as recently used
+        return embedding
+
+    def _remember(self, text: str, embedding: list[float]) -> list[float]:
+        self._query_cache[text] = embedding
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> OpenAIEmbeddings:
+    """Return the process-wide embeddings client."""
+    # Extra retries ride out rate limiting during bulk ingestion
+    return CachedQueryEmbeddings(
+        model=EMBEDDING_MODEL,
+        max_retries=6,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
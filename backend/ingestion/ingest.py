@@ -4,19 +4,28 @@ Document ingestion pipeline.
 This script:
 1. Reads all PDF files from the data/ directory
 2. Splits them into smaller text chunks (because LLMs have token limits)
+   — steps 1 and 2 run in parallel, one worker process per PDF
 3. Generates vector embeddings for each chunk (numerical representation of meaning)
 4. Stores everything in ChromaDB (a local vector database) for fast semantic search
 """
 
+import asyncio
+import os
+import re
 import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
 
+import chromadb
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from ingestion.embeddings import get_embeddings
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -40,6 +49,21 @@ REGULATION_MAP = {
     "sb21": "Colorado SB21-169",
 }
 
+# All REGULATION_MAP keys as one alternation, so a filename is scanned once
+_REGULATION_PATTERN = re.compile("|".join(re.escape(key) for key in REGULATION_MAP))
+
+# HNSW index settings for the Chroma collection (fixed at creation time,
+# so changing them requires re-running ingestion):
+# - cosine distance, which is what OpenAI embeddings are designed for
+# - M=32 neighbours per node and construction_ef=200 for a higher-recall graph
+# - search_ef=64 candidates per query: good recall at low query latency
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64,
+}
+
 
 def detect_regulation_name(filename: str) -> str:
     """
@@ -47,25 +71,34 @@ def detect_regulation_name(filename: str) -> str:
 
     How it works:
     - Converts filename to lowercase
-    - Checks if any key from REGULATION_MAP appears in the filename
-    - Returns the matched regulation name, or "Unknown" if no match
+    - Searches it for any key from REGULATION_MAP (one regex scan)
+    - Returns the regulation for the first key found, or "Unknown"
 
     Example:
         "SR1107a1.pdf" -> looks for "sr1107" in "sr1107a1.pdf" -> "SR 11-7"
         "NIST.AI.100-1.pdf" -> looks for "nist" in "nist.ai.100-1.pdf" -> "NIST AI RMF"
     """
-    name_lower = filename.lower()
-    for key, regulation in REGULATION_MAP.items():
-        if key in name_lower:
-            return regulation
-    return "Unknown"
+    match = _REGULATION_PATTERN.search(filename.lower())
+    return REGULATION_MAP[match.group(0)] if match else "Unknown"
+
+
+def find_pdfs(data_dir: Path) -> list[Path]:
+    """Return all PDF files in the data directory (exits if there are none)."""
+    pdf_files = sorted(data_dir.glob("*.pdf"))
+
+    if not pdf_files:
+        print(f"No PDF files found in {data_dir}")
+        print("Please add regulatory PDF documents to the data/ directory.")
+        sys.exit(1)
 
+    return pdf_files
 
-def load_pdfs(data_dir: Path) -> list:
+
+def load_pdf(pdf_path: Path) -> list:
     """
-    Load all PDF files from the data directory.
+    Load a single PDF file, one Document per page.
 
-    For each page in each PDF, we attach metadata:
+    For each page, we attach metadata:
     - regulation: which regulation this page belongs to (e.g., "SR 11-7")
     - source: the original filename
     - page: the page number
@@ -73,32 +106,43 @@ def load_pdfs(data_dir: Path) -> list:
     This metadata is crucial later — it lets us filter search results
     by regulation and show users exactly where an answer came from.
     """
-    all_docs = []
-    pdf_files = list(data_dir.glob("*.pdf"))
+    regulation_name = detect_regulation_name(pdf_path.name)
+    file_metadata = {"regulation": regulation_name, "source": pdf_path.name}
 
-    if not pdf_files:
-        print(f"No PDF files found in {data_dir}")
-        print("Please add regulatory PDF documents to the data/ directory.")
-        sys.exit(1)
+    loader = PyPDFLoader(str(pdf_path))
+    pages = loader.load()
+
+    # Attach the same file-level metadata to each page.
+    # PyPDFLoader already sets "page" in metadata (0-indexed)
+    for page in pages:
+        page.metadata.update(file_metadata)
+
+    print(f"Loaded: {pdf_path.name} -> {regulation_name} ({len(pages)} pages)")
+    return pages
+
+
+def _load_and_chunk(pdf_path: Path) -> list:
+    """Load and chunk one PDF. Module-level so worker processes can run it."""
+    return chunk_documents(load_pdf(pdf_path))
 
-    for pdf_path in pdf_files:
-        print(f"Loading: {pdf_path.name}")
-        regulation_name = detect_regulation_name(pdf_path.name)
-        print(f"  -> Detected regulation: {regulation_name}")
 
-        loader = PyPDFLoader(str(pdf_path))
-        pages = loader.load()
+def load_and_chunk_pdfs(data_dir: Path) -> list:
+    """
+    Load and chunk every PDF in the data directory.
+
+    PDF parsing is CPU-bound and each file is independent, so every PDF
+    is handled by its own worker process and the chunks are merged in
+    file order afterwards.
+    """
+    pdf_files = find_pdfs(data_dir)
+    workers = min(len(pdf_files), os.cpu_count() or 1)
 
-        # Attach metadata to each page
-        for page in pages:
-            page.metadata["regulation"] = regulation_name
-            page.metadata["source"] = pdf_path.name
-            # PyPDFLoader already sets "page" in metadata (0-indexed)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(chain.from_iterable(executor.map(_load_and_chunk, pdf_files)))
 
-        all_docs.extend(pages)
-        print(f"  -> Loaded {len(pages)} pages")
 
-    return all_docs
+# Characters of each chunk returned as its "content" in API responses
+PREVIEW_LENGTH = 300
 
 
 def chunk_documents(documents: list) -> list:
@@ -126,9 +170,48 @@ def chunk_documents(documents: list) -> list:
     )
 
     chunks = splitter.split_documents(documents)
+
+    # Store the snippet shown in API source lists, so answering a
+    # question never has to re-slice the chunk text
+    for chunk in chunks:
+        chunk.metadata["preview"] = chunk.page_content[:PREVIEW_LENGTH]
+
     return chunks
 
 
+# OpenAI accepts up to 2048 inputs per embeddings request; batches of 1000
+# keep each request comfortably under the per-request token limit.
+EMBEDDING_BATCH_SIZE = 1000
+
+# How many embedding requests may be in flight at once. Higher is faster
+# until OpenAI starts rate-limiting (the client retries 429s).
+MAX_CONCURRENT_EMBEDDING_REQUESTS = 10
+
+
+async def embed_chunks(texts: list[str]) -> list[list[float]]:
+    """
+    Embed all chunk texts, several large batches at a time.
+
+    Batches are sent concurrently (at most MAX_CONCURRENT_EMBEDDING_REQUESTS
+    in flight) instead of one after another, so ingestion time is bounded
+    by OpenAI's rate limits rather than by request round-trips.
+    """
+    embeddings = get_embeddings()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_EMBEDDING_REQUESTS)
+
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    batches = [
+        texts[i:i + EMBEDDING_BATCH_SIZE]
+        for i in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+
+    return list(chain.from_iterable(results))
+
+
 def create_vector_store(chunks: list) -> Chroma:
     """
     Generate embeddings and store in ChromaDB.
@@ -145,19 +228,37 @@ def create_vector_store(chunks: list) -> Chroma:
     - Returns 1536-dimensional vectors
 
     ChromaDB stores these vectors locally on disk so we don't have to
-    re-generate embeddings every time.
+    re-generate embeddings every time. The collection is indexed with
+    the HNSW settings in COLLECTION_METADATA.
+
+    Embeddings are computed up front by embed_chunks() and written
+    straight into the Chroma collection.
     """
     print(f"\nCreating vector store at: {CHROMA_DIR}")
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = asyncio.run(embed_chunks(texts))
 
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=str(CHROMA_DIR),
+    client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+    vectorstore = Chroma(
+        client=client,
         collection_name="regulations",
+        embedding_function=get_embeddings(),
+        collection_metadata=COLLECTION_METADATA,
     )
 
+    # Chroma limits how many records a single add() call may contain
+    collection = client.get_collection("regulations")
+    batch_size = client.get_max_batch_size()
+    for start in range(0, len(chunks), batch_size):
+        end = start + batch_size
+        collection.add(
+            ids=[str(uuid.uuid4()) for _ in chunks[start:end]],
+            embeddings=vectors[start:end],
+            documents=texts[start:end],
+            metadatas=[chunk.metadata for chunk in chunks[start:end]],
+        )
+
     return vectorstore
 
 
@@ -167,15 +268,10 @@ def main():
     print("  Regulatory Document Ingestion Pipeline")
     print("=" * 60)
 
-    # Step 1: Load PDFs
-    print(f"\n[Step 1/3] Loading PDFs from {DATA_DIR}...")
-    documents = load_pdfs(DATA_DIR)
-    print(f"\nTotal pages loaded: {len(documents)}")
-
-    # Step 2: Chunk documents
-    print("\n[Step 2/3] Splitting into chunks...")
-    chunks = chunk_documents(documents)
-    print(f"Total chunks created: {len(chunks)}")
+    # Step 1: Load PDFs and split them into chunks (in parallel)
+    print(f"\n[Step 1/2] Loading and chunking PDFs from {DATA_DIR}...")
+    chunks = load_and_chunk_pdfs(DATA_DIR)
+    print(f"\nTotal chunks created: {len(chunks)}")
 
     # Show a sample chunk so you can verify it looks right
     if chunks:
@@ -186,8 +282,8 @@ def main():
         print(f"  Page: {sample.metadata.get('page')}")
         print(f"  Text preview: {sample.page_content[:150]}...")
 
-    # Step 3: Create vector store
-    print("\n[Step 3/3] Creating vector store and generating embeddings...")
+    # Step 2: Create vector store
+    print("\n[Step 2/2] Creating vector store and generating embeddings...")
     vectorstore = create_vector_store(chunks)
     print("Vector store created successfully!")
 
@@ -8,34 +8,46 @@ relevant regulatory passages when answering user questions.
 Two main ways to search:
 1. get_retriever() - Returns a LangChain Retriever object (used in chains)
 2. similarity_search() - Direct search, returns a list of Document objects
+
+The agents run inside an async LangGraph pipeline, so async variants
+(aembed_query, asimilarity_search) are provided as well.
+asimilarity_search_with_context() also picks a smaller, less redundant
+subset of its results for prompts. Both async searches record each result's relevance score (0-1,
+higher is more similar) in doc.metadata["score"].
 """
 
+from collections.abc import Sequence
+from functools import lru_cache
 from pathlib import Path
 
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
 from langchain_chroma import Chroma
+from langchain_chroma.vectorstores import maximal_marginal_relevance
+from langchain_core.runnables.config import run_in_executor
+
+from ingestion.embeddings import get_embeddings
 
 # Path to the persisted ChromaDB directory
 CHROMA_DIR = Path(__file__).resolve().parent.parent / "chroma_db"
 
 
+@lru_cache(maxsize=1)
 def get_vectorstore() -> Chroma:
     """
     Load and return the persisted ChromaDB vector store.
 
     This connects to the vector store we created during ingestion.
     It does NOT re-create embeddings — it just loads what's already on disk.
-    """
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
 
-    vectorstore = Chroma(
+    The store is opened once per process and reused by every search, so
+    queries don't pay for reconnecting to Chroma or a new embeddings client.
+    """
+    return Chroma(
         persist_directory=str(CHROMA_DIR),
-        embedding_function=embeddings,
+        embedding_function=get_embeddings(),
         collection_name="regulations",
     )
 
-    return vectorstore
-
 
 def get_retriever(k: int = 7, filter_dict: dict | None = None):
     """
@@ -94,3 +106,181 @@ def similarity_search(
         results = vectorstore.similarity_search(query, k=k)
 
     return results
+
+
+async def aembed_query(query: str) -> list[float]:
+    """
+    Embed a query with the same model the vector store was built with.
+
+    The pipeline embeds the query once, up front, and passes the vector
+    to asimilarity_search() so every search after that skips the
+    OpenAI embedding round-trip.
+    """
+    return await get_vectorstore().embeddings.aembed_query(query)
+
+
+async def asimilarity_search(
+    query: str,
+    k: int = 7,
+    filter_dict: dict | None = None,
+    embedding: list[float] | None = None,
+) -> list:
+    """
+    Async version of similarity_search().
+
+    Parameters:
+        query: The search query (only embedded if no embedding is given)
+        k: Number of results to return
+        filter_dict: Optional metadata filter
+        embedding: Optional precomputed embedding of the query
+
+    Returns:
+        List of Document objects, same shape as similarity_search(),
+        with the relevance score of each in metadata["score"].
+    """
+    vectorstore = get_vectorstore()
+
+    if embedding is None:
+        embedding = await vectorstore.embeddings.aembed_query(query)
+
+    # Chroma returns distances; see _relevance()
+    results = await run_in_executor(
+        None,
+        vectorstore.similarity_search_by_vector_with_relevance_scores,
+        embedding,
+        k=k,
+        filter=filter_dict,
+    )
+    docs = []
+    for doc, distance in results:
+        doc.metadata["score"] = _relevance(distance)
+        docs.append(doc)
+    return docs
+
+
+async def asimilarity_search_with_context(
+    query: str,
+    k: int,
+    context_k: int,
+    filter_dict: dict | None = None,
+    embedding: list[float] | None = None,
+    lambda_mult: float = 0.5,
+) -> tuple[list, list]:
+    """
+    Top-k search, plus a smaller, less redundant pick of the same chunks.
+
+    The pick uses Maximal Marginal Relevance: context_k of the top-k are
+    chosen one at a time, each time preferring the chunk that is relevant
+    to the query but least similar to the chunks already picked.
+    Neighbouring chunks overlap (see chunk_overlap in ingest.py), so a
+    plain top-k often contains the same passage two or three times.
+
+    The pick only ever comes from the top-k, so a prompt built from it
+    can't cite a passage missing from the full set. The stored vectors
+    of the results are then read by id (a lookup, not a second search)
+    and MMR runs on them in memory.
+
+    Parameters:
+        query: The search query (only embedded if no embedding is given)
+        k: Number of results to return
+        context_k: How many of those to pick with MMR
+        filter_dict: Optional metadata filter
+        embedding: Optional precomputed embedding of the query
+        lambda_mult: 1.0 = pure relevance, 0.0 = pure diversity
+
+    Returns:
+        (top-k results like asimilarity_search(), the MMR pick of them)
+    """
+    vectorstore = get_vectorstore()
+
+    if embedding is None:
+        embedding = await vectorstore.embeddings.aembed_query(query)
+
+    results = await run_in_executor(
+        None,
+        vectorstore.similarity_search_by_vector_with_relevance_scores,
+        embedding,
+        k=k,
+        filter=filter_dict,
+    )
+
+    docs = []
+    for doc, distance in results:
+        doc.metadata["score"] = _relevance(distance)
+        docs.append(doc)
+    vectors = await run_in_executor(None, _stored_embeddings, vectorstore, docs)
+
+    picked = maximal_marginal_relevance(
+        np.asarray(embedding, dtype=np.float32), vectors, lambda_mult=lambda_mult, k=context_k
+    )
+    return docs, [docs[i] for i in picked]
+
+
+def _relevance(distance: float) -> float:
+    """
+    Turn a Chroma distance into a relevance score (0-1, higher is better).
+
+    The collection uses cosine distance (see COLLECTION_METADATA in
+    ingest.py), so this is the cosine similarity.
+    """
+    return 1.0 - distance
+
+
+def _stored_embeddings(vectorstore: Chroma, docs: list) -> list:
+    """
+    Return the stored embedding of each document, in the same order.
+
+    langchain-chroma has no public way to read stored vectors, so this is
+    the only place that uses the underlying Chroma collection directly.
+    """
+    if not docs:
+        return []
+    stored = vectorstore._collection.get(
+        ids=[doc.id for doc in docs], include=["embeddings"]
+    )
+    by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    return [by_id[doc.id] for doc in docs]
+
+
+async def asimilarity_search_multi(
+    query: str,
+    k_per_reg: int,
+    regulations: Sequence[str],
+    embedding: list[float] | None = None,
+) -> list:
+    """
+    Search several regulations at once, keeping each one represented.
+
+    Instead of one search per regulation, this runs a single Chroma query
+    restricted to the given regulations (a "$in" filter) and then splits
+    the results by regulation in Python.
+
+    Parameters:
+        query: The search query (only embedded if no embedding is given)
+        k_per_reg: Maximum number of results per regulation
+        regulations: e.g., ("SR 11-7", "NIST AI RMF")
+        embedding: Optional precomputed embedding of the query
+
+    Returns:
+        List of Document objects, grouped by regulation in the order given.
+    """
+    vectorstore = get_vectorstore()
+
+    if embedding is None:
+        embedding = await vectorstore.embeddings.aembed_query(query)
+
+    # One regulation can dominate the nearest neighbours, so fetch a larger
+    # pool than strictly needed before splitting it per regulation.
+    results = await vectorstore.asimilarity_search_by_vector(
+        embedding,
+        k=k_per_reg * len(regulations) * 2,
+        filter={"regulation": {"$in": list(regulations)}},
+    )
+
+    buckets = {regulation: [] for regulation in regulations}
+    for doc in results:
+        bucket = buckets.get(doc.metadata.get("regulation"))
+        if bucket is not None and len(bucket) < k_per_reg:
+            bucket.append(doc)
+
+    return [doc for regulation in regulations for doc in buckets[regulation]]
@@ -5,38 +5,104 @@ This wraps our multi-agent pipeline in a web server so the React
 frontend (or any HTTP client) can send questions and get answers.
 
 Endpoints:
-  POST /api/ask     — Submit a question, get an answer with sources
-  GET  /api/health  — Check if the server is running
+  POST /api/ask         — Submit a question, get an answer with sources
+                          (ETag / If-None-Match for cached answers)
+  POST /api/ask/stream  — Same, but the answer streams in as Server-Sent Events
+  GET  /api/health      — Check if the server is running
 
 Run with:
-  uvicorn main:app --reload --port 8000
+  uvicorn main:app --reload --port 8000 --loop uvloop --http httptools
+
+uvloop (a libuv-based event loop) and httptools (a C HTTP parser) come
+with uvicorn[standard] and are faster than the pure-Python defaults.
+
+In production, run one worker process per CPU core under gunicorn
+(settings in gunicorn_conf.py):
+  gunicorn -c gunicorn_conf.py main:app
+Each worker is a single event loop that already serves many questions
+concurrently (the pipeline is async end to end), so more workers than
+cores only adds memory. Note that each worker has its own response cache.
 """
 
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from graph import ask_question
+from graph import ask_question_stream, ask_question_with_etag, enable_llm_cache, response_cache
+from http_clients import close_http_clients
+from warmup import warmup, warmup_pipeline
 
 load_dotenv()
 
+# Threads for the blocking work the pipeline hands off (Chroma searches).
+# Each question runs up to three searches at once; the asyncio default of
+# min(32, CPUs + 4) threads would queue them on small machines.
+EXECUTOR_THREADS = int(os.getenv("EXECUTOR_THREADS", "64"))
+
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSON response encoded with orjson instead of the standard library.
+
+    Answers carry long strings (the answer and source previews), and
+    orjson encodes them straight to UTF-8 bytes in C, several times
+    faster than json.dumps. (FastAPI's own ORJSONResponse does the same
+    but is deprecated.)
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the LLM cache, build the LLM clients, open the vector store and
+    warm up before serving; close the shared HTTP connections on shutdown.
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=EXECUTOR_THREADS, thread_name_prefix="pipeline")
+    )
+    enable_llm_cache()
+    warmup()
+    await warmup_pipeline()
+    yield
+    await close_http_clients()
+
+
 # Create the FastAPI app
 app = FastAPI(
     title="Regulatory Q&A API",
     description="Multi-agent RAG system for regulatory compliance questions",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse,
 )
 
+# Compress responses over 1 KB. Answers with their source previews are
+# mostly plain text and shrink several times over. Small bodies (the
+# health check) and the /api/ask/stream event stream are left alone.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # CORS (Cross-Origin Resource Sharing) middleware.
 # Without this, the React frontend (running on a different port/domain)
 # would be BLOCKED from calling our API.
 # Set CORS_ORIGINS env var as comma-separated URLs for production.
-_default_origins = ["http://localhost:5173", "http://localhost:3000"]
-_cors_origins = os.getenv("CORS_ORIGINS")
-allowed_origins = [o.strip() for o in _cors_origins.split(",")] if _cors_origins else _default_origins
+# Like every setting in the backend, it is read once at import time; the
+# request path never touches os.environ.
+_DEFAULT_ORIGINS = ("http://localhost:5173", "http://localhost:3000")
+allowed_origins = tuple(
+    o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()
+) or _DEFAULT_ORIGINS
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +110,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend read the ETag to send back in If-None-Match
+    expose_headers=["ETag"],
 )
 
 
@@ -72,7 +140,13 @@ class VerificationClaim(BaseModel):
 
 
 class QueryResponse(BaseModel):
-    """What we send back to the frontend."""
+    """
+    What we send back to the frontend.
+
+    Only used to document the response in the OpenAPI schema: the
+    pipeline already builds this exact shape, so /api/ask returns it
+    without validating it a second time.
+    """
     answer: str
     sources: list[SourceDocument]
     confidence: float
@@ -82,8 +156,25 @@ class QueryResponse(BaseModel):
 
 # --- Endpoints ---
 
-@app.post("/api/ask", response_model=QueryResponse)
-def ask(request: QueryRequest):
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (may list several)."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for tag in if_none_match.split(",")
+    )
+
+
+@app.post(
+    "/api/ask",
+    responses={200: {"model": QueryResponse}, 304: {"description": "Answer unchanged"}},
+)
+async def ask(
+    request: QueryRequest,
+    nocache: bool = False,
+    if_none_match: str | None = Header(default=None),
+):
     """
     Main endpoint — submit a regulatory question.
 
@@ -92,9 +183,58 @@ def ask(request: QueryRequest):
 
     Behind the scenes, this calls the full agent pipeline:
     Router -> Retriever -> Synthesizer -> Compliance Checker
+
+    Repeated questions are answered from the response cache; add
+    ?nocache=1 to the URL to always run the pipeline (for debugging).
+
+    Cached answers come with an ETag. A client that sends it back in
+    If-None-Match gets an empty 304 Not Modified instead of the answer.
     """
-    result = ask_question(request.question)
-    return QueryResponse(**result)
+    if if_none_match and not nocache:
+        etag = response_cache.etag(request.question)
+        if etag is not None and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    result, etag = await ask_question_with_etag(request.question, use_cache=not nocache)
+
+    # Returning a Response skips FastAPI's jsonable_encoder / model pass
+    response = OrjsonResponse(result)
+    # Only set when this exact answer is cached (served from the cache or
+    # confident enough to store), so the tag always matches the body
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
+
+
+async def _sse_events(question: str, use_cache: bool):
+    """Format the pipeline's (event, data) pairs as Server-Sent Events."""
+    async for event, data in ask_question_stream(question, use_cache=use_cache):
+        yield b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.post("/api/ask/stream")
+async def ask_stream(request: QueryRequest, nocache: bool = False):
+    """
+    Streaming endpoint — same question, answer sent as it is written.
+
+    Returns a text/event-stream with these events:
+      token  {"text": "..."}   the next piece of the answer
+      retry  {}                the answer is being rewritten; clear it
+      result {...}             the full response, same shape as /api/ask
+
+    The first words arrive after about one LLM round-trip instead of
+    after the whole pipeline has finished.
+    """
+    return StreamingResponse(
+        _sse_events(request.question, use_cache=not nocache),
+        media_type="text/event-stream",
+        # Stop proxies (e.g. nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Encoded once: monitors poll the health check constantly
+_HEALTH_BODY = b'{"status":"healthy"}'
 
 
 @app.get("/api/health")
@@ -105,4 +245,4 @@ def health():
     Useful for monitoring and for Docker health checks.
     The frontend can call this on load to verify the backend is up.
     """
-    return {"status": "healthy"}
+    return Response(_HEALTH_BODY, media_type="application/json")
@@ -6,9 +6,22 @@ and produces the expected output. We mock the OpenAI API calls
 so tests are fast, free, and don't need a real API key.
 """
 
-from unittest.mock import patch, MagicMock
-from agents.router import detect_regulations, router_agent
-from agents.state import AgentState
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+from langchain_core.caches import InMemoryCache
+from langchain_core.documents import Document
+from agents.compliance_checker import (
+    MAX_CONCURRENT_BATCHES,
+    ClaimLabel,
+    VerificationResult,
+    build_verification,
+    extract_claims,
+    verify_answer_stream,
+)
+from agents.retriever import CONTEXT_K, retriever_agent
+from agents.router import _shadow_tasks, detect_regulations, router_agent
+from agents.state import AgentState, QueryType
+from agents.synthesizer import build_messages, extractive_answer, stream_answer
 
 
 # --- Router Agent Tests ---
@@ -39,6 +52,12 @@ class TestDetectRegulations:
         result = detect_regulations("NAIC model bulletin on AI")
         assert "NAIC Model Bulletin" in result
 
+    def test_tolerates_spacing_variants(self):
+        assert detect_regulations("sr 11 7 and ISO/IEC 42001") == ["SR 11-7", "ISO 42001"]
+
+    def test_ignores_keywords_inside_words(self):
+        assert detect_regulations("Which administrative controls apply?") == []
+
     def test_no_regulation_mentioned(self):
         assert detect_regulations("What is model risk?") == []
 
@@ -50,44 +69,375 @@ class TestRouterAgent:
         return {
             "query": query,
             "query_type": "",
-            "target_regulations": [],
+            "target_regulations": (),
+            "query_embedding": [],
             "retrieved_docs": [],
+            "context_docs": [],
+            "retrieved_docs_wide": [],
             "answer": "",
             "verification": {},
             "retry_count": 0,
         }
 
     @patch("agents.router.get_llm")
-    def test_classifies_lookup(self, mock_get_llm):
-        mock_response = MagicMock()
-        mock_response.content = "LOOKUP"
-        mock_get_llm.return_value.invoke.return_value = mock_response
-
+    def test_classifies_lookup_locally(self, mock_get_llm):
         state = self._make_state("What does SR 11-7 say about validation?")
-        result = router_agent(state)
+        result = asyncio.run(router_agent(state))
 
         assert result["query_type"] == "LOOKUP"
         assert "SR 11-7" in result["target_regulations"]
+        mock_get_llm.assert_not_called()
 
     @patch("agents.router.get_llm")
-    def test_classifies_compare(self, mock_get_llm):
-        mock_response = MagicMock()
-        mock_response.content = "COMPARE"
-        mock_get_llm.return_value.invoke.return_value = mock_response
-
+    def test_classifies_compare_locally(self, mock_get_llm):
         state = self._make_state("How do SR 11-7 and NIST differ?")
-        result = router_agent(state)
+        result = asyncio.run(router_agent(state))
 
         assert result["query_type"] == "COMPARE"
         assert len(result["target_regulations"]) == 2
+        mock_get_llm.assert_not_called()
+
+    @patch("agents.router.get_llm")
+    def test_ambiguous_query_falls_back_to_llm(self, mock_get_llm):
+        mock_response = MagicMock()
+        mock_response.content = "CHECKLIST"
+        mock_get_llm.return_value.ainvoke = AsyncMock(return_value=mock_response)
+
+        # Matches both the EXPLAIN and CHECKLIST patterns
+        state = self._make_state("What is the first step for NAIC compliance?")
+        result = asyncio.run(router_agent(state))
+
+        assert result["query_type"] == "CHECKLIST"
+        mock_get_llm.return_value.ainvoke.assert_awaited_once()
+
+    @patch("agents.router.ROUTER_SHADOW_LLM", True)
+    @patch("agents.router.get_llm")
+    def test_shadow_llm_runs_in_background(self, mock_get_llm):
+        release = asyncio.Event()
+
+        async def slow_classify(prompt):
+            await release.wait()
+            return MagicMock(content="LOOKUP")
+
+        mock_get_llm.return_value.ainvoke = AsyncMock(side_effect=slow_classify)
+        state = self._make_state("What does SR 11-7 say about validation?")
+
+        async def run():
+            result = await router_agent(state)
+            # The answer doesn't wait for the shadow comparison
+            assert [task.done() for task in _shadow_tasks] == [False]
+            release.set()
+            await asyncio.gather(*_shadow_tasks)
+            return result
+
+        assert asyncio.run(run())["query_type"] == "LOOKUP"
+        mock_get_llm.return_value.ainvoke.assert_awaited_once()
 
     @patch("agents.router.get_llm")
     def test_defaults_to_explain_on_invalid(self, mock_get_llm):
         mock_response = MagicMock()
         mock_response.content = "INVALID_TYPE"
-        mock_get_llm.return_value.invoke.return_value = mock_response
+        mock_get_llm.return_value.ainvoke = AsyncMock(return_value=mock_response)
 
         state = self._make_state("Some random question")
-        result = router_agent(state)
+        result = asyncio.run(router_agent(state))
 
         assert result["query_type"] == "EXPLAIN"
+
+
+# --- Retriever Agent Tests ---
+
+class TestRetrieverAgent:
+    """Test retrieval post-processing with a mocked vector store."""
+
+    @patch("agents.retriever.asimilarity_search_multi", new_callable=AsyncMock)
+    def test_compare_drops_duplicate_chunks(self, mock_search_multi):
+        def doc(regulation, page):
+            return Document(
+                page_content=f"{regulation} text on page {page}",
+                metadata={"regulation": regulation, "source": f"{regulation}.pdf", "page": page},
+            )
+
+        # The same SR 11-7 chunk stored twice (e.g. ingestion was run twice)
+        mock_search_multi.return_value = [
+            doc("SR 11-7", 3), doc("SR 11-7", 3), doc("NIST AI RMF", 7),
+        ]
+        state = {
+            "query": "How do SR 11-7 and NIST differ?",
+            "query_type": QueryType.COMPARE,
+            "target_regulations": ("SR 11-7", "NIST AI RMF"),
+            "query_embedding": [0.1, 0.2],
+            "retry_count": 0,
+        }
+        result = asyncio.run(retriever_agent(state))
+
+        pages = [(d.metadata["regulation"], d.metadata["page"]) for d in result["retrieved_docs"]]
+        assert pages == [("SR 11-7", 3), ("NIST AI RMF", 7)]
+        assert result["context_docs"] == result["retrieved_docs"]
+
+    @patch("ingestion.retriever.get_vectorstore")
+    def test_context_docs_come_from_retrieved_docs(self, mock_get_vectorstore):
+        # Seven chunks in near-duplicate pairs, as overlapping chunks are
+        vectors = [[1.0, i // 2 * 0.5, i % 2 * 0.01] for i in range(7)]
+        vectorstore = MagicMock()
+        vectorstore.similarity_search_by_vector_with_relevance_scores.return_value = [
+            (Document(page_content=f"Passage {i}", id=str(i),
+                      metadata={"regulation": "SR 11-7", "source": "sr.pdf", "page": i}), 0.1 * i)
+            for i in range(7)
+        ]
+        # Chroma returns fetched records in its own order, not the ids'
+        vectorstore._collection.get.return_value = {
+            "ids": [str(i) for i in reversed(range(7))],
+            "embeddings": list(reversed(vectors)),
+        }
+        mock_get_vectorstore.return_value = vectorstore
+
+        state = {
+            "query": "What are the principles of model risk management?",
+            "query_type": QueryType.EXPLAIN,
+            "target_regulations": (),
+            "query_embedding": [1.0, 0.0, 0.0],
+            "retry_count": 0,
+        }
+        result = asyncio.run(retriever_agent(state))
+
+        # The checker verifies against retrieved_docs, so it must include
+        # every passage the Synthesizer can cite
+        assert len(result["retrieved_docs"]) == 7
+        assert len(result["context_docs"]) == CONTEXT_K
+        assert all(doc in result["retrieved_docs"] for doc in result["context_docs"])
+        # One search serves both sets
+        vectorstore.similarity_search_by_vector_with_relevance_scores.assert_called_once()
+        # Vectors are matched by id: chunk 0's is the one closest to the query
+        assert result["context_docs"][0].metadata["page"] == 0
+
+
+# --- Synthesizer Tests ---
+
+class TestExtractiveAnswer:
+    """Test the LOOKUP fast path that skips the Synthesizer LLM."""
+
+    def _make_state(self, score: float, regulation: str = "SR 11-7") -> dict:
+        doc = Document(
+            page_content="Validation should be performed by independent staff.",
+            metadata={"regulation": regulation, "page": 9, "score": score},
+        )
+        return {
+            "query": "What does SR 11-7 say about who validates models?",
+            "query_type": QueryType.LOOKUP,
+            "target_regulations": ("SR 11-7",),
+            "retrieved_docs": [doc],
+            "retry_count": 1,
+        }
+
+    def test_returns_top_passage_with_citation(self):
+        # A near-verbatim match scores about 0.7 with text-embedding-3-small
+        assert extractive_answer(self._make_state(score=0.71)) == (
+            "Validation should be performed by independent staff. "
+            "[Source: SR 11-7, Page 9]"
+        )
+
+    def test_joins_pdf_line_breaks(self):
+        state = self._make_state(score=0.71)
+        state["retrieved_docs"][0].page_content = (
+            "Validation involves a degree of\n"
+            "independence from model development\n"
+            "and use.  Staff should not have a stake in\n"
+            "whether a model is determined to be valid.\n"
+        )
+
+        answer = extractive_answer(state)
+
+        assert "\n" not in answer
+        assert extract_claims(answer) == [
+            "Validation involves a degree of independence from model development and use.",
+            "Staff should not have a stake in whether a model is determined to be valid.",
+        ]
+
+    def test_trims_sentence_fragments_at_chunk_edges(self):
+        state = self._make_state(score=0.71)
+        state["retrieved_docs"][0].page_content = (
+            "and use of the model. Validation should be performed by\n"
+            "independent staff. Staff should not have a stake in whether"
+        )
+
+        assert extractive_answer(state) == (
+            "Validation should be performed by independent staff. "
+            "[Source: SR 11-7, Page 9]"
+        )
+
+    def test_skipped_without_a_whole_sentence(self):
+        state = self._make_state(score=0.71)
+        state["retrieved_docs"][0].page_content = "performed by independent staff, who"
+
+        assert extractive_answer(state) is None
+
+    def test_skipped_for_low_score_or_other_regulation(self):
+        # A typical relevant-but-partial match
+        assert extractive_answer(self._make_state(score=0.48)) is None
+        assert extractive_answer(self._make_state(score=0.71, regulation="ISO 42001")) is None
+
+
+class TestBuildMessages:
+    """Test which passages end up in the Synthesizer prompt."""
+
+    def test_prompt_uses_context_docs_only(self):
+        state = {
+            "query": "What does SR 11-7 say about validation?",
+            "query_type": QueryType.LOOKUP,
+            "retrieved_docs": [
+                Document(page_content="Picked passage", metadata={}),
+                Document(page_content="Redundant passage", metadata={}),
+            ],
+            "context_docs": [Document(page_content="Picked passage", metadata={})],
+        }
+        user_message = build_messages(state)[1]["content"]
+
+        assert "Picked passage" in user_message
+        assert "Redundant passage" not in user_message
+
+
+class TestStreamAnswer:
+    """Test the opt-in cache for streamed answers (CACHE_SYNTHESIZER=1)."""
+
+    def _make_state(self) -> dict:
+        return {
+            "query": "How should model risk be governed?",
+            "query_type": QueryType.EXPLAIN,
+            "target_regulations": (),
+            "retrieved_docs": [Document(page_content="Boards oversee model risk.", metadata={})],
+            "context_docs": [],
+            "retry_count": 1,
+        }
+
+    @staticmethod
+    async def _collect(state) -> str:
+        return "".join([chunk async for chunk in stream_answer(state)])
+
+    @patch("agents.synthesizer.CACHE_SYNTHESIZER", True)
+    @patch("agents.synthesizer.get_llm_cache")
+    @patch("agents.synthesizer.get_llm")
+    def test_repeat_prompt_is_answered_from_cache(self, mock_get_llm, mock_get_llm_cache):
+        async def astream(messages):
+            for text in ("Boards oversee ", "model risk."):
+                yield MagicMock(content=text)
+
+        mock_get_llm.return_value.astream = MagicMock(side_effect=astream)
+        mock_get_llm.return_value._get_llm_string.return_value = "gpt-4o"
+        mock_get_llm_cache.return_value = InMemoryCache()
+
+        first = asyncio.run(self._collect(self._make_state()))
+        second = asyncio.run(self._collect(self._make_state()))
+
+        assert first == second == "Boards oversee model risk."
+        mock_get_llm.return_value.astream.assert_called_once()
+
+
+# --- Compliance Checker Tests ---
+
+class TestExtractClaims:
+    """Test the local (no LLM) claim extraction."""
+
+    def test_splits_sentences(self):
+        answer = (
+            "SR 11-7 requires independent validation [Source: SR 11-7, Page 9]. "
+            "Validation should include outcomes analysis."
+        )
+        assert extract_claims(answer) == [
+            "SR 11-7 requires independent validation [Source: SR 11-7, Page 9].",
+            "Validation should include outcomes analysis.",
+        ]
+
+    def test_strips_list_markers_and_headings(self):
+        answer = "### Steps\n1. Maintain a model inventory.\n- Document all model assumptions."
+        assert extract_claims(answer) == [
+            "Maintain a model inventory.",
+            "Document all model assumptions.",
+        ]
+
+    def test_skips_standalone_citations(self):
+        answer = "Models must be validated by independent staff. [Source: SR 11-7, Page 9]"
+        assert extract_claims(answer) == ["Models must be validated by independent staff."]
+
+
+class TestBuildVerification:
+    """Test combining claim labels into the verification result."""
+
+    def test_confidence_is_ratio_of_supported(self):
+        claims = ["claim one", "claim two", "claim three", "claim four"]
+        labels = {
+            1: ClaimLabel(id=1, status="SUPPORTED", source="SR 11-7, Page 1"),
+            2: ClaimLabel(id=2, status="PARTIAL", source="SR 11-7, Page 2"),
+            3: ClaimLabel(id=3, status="SUPPORTED", source="SR 11-7, Page 3"),
+            4: ClaimLabel(id=4, status="UNSUPPORTED", source=None),
+        }
+        result = build_verification(claims, labels)
+
+        assert result["confidence"] == 0.5
+        assert result["claims"][1] == {
+            "text": "claim two", "status": "PARTIAL", "source": "SR 11-7, Page 2",
+        }
+        assert result["summary"] == "2 of 4 claims are supported by source documents"
+
+    def test_missing_labels_are_unsupported(self):
+        result = build_verification(["claim one"], {})
+        assert result["claims"][0]["status"] == "UNSUPPORTED"
+        assert result["confidence"] == 0.0
+
+
+class TestVerifyAnswerStream:
+    """Test verifying claims while the answer is being streamed."""
+
+    @staticmethod
+    async def _stream(text: str):
+        for word in text.split(" "):
+            yield word + " "
+
+    @staticmethod
+    async def _label_all_supported(prompt: str):
+        # Label every numbered claim in the prompt's CLAIMS section
+        claims_section = prompt.split("CLAIMS:\n")[1].split("\n\n")[0]
+        ids = [int(line.split(".")[0]) for line in claims_section.splitlines()]
+        return VerificationResult(claims=[
+            ClaimLabel(id=i, status="SUPPORTED", source="SR 11-7, Page 1") for i in ids
+        ])
+
+    @patch("agents.compliance_checker.get_llm")
+    def test_verifies_claims_in_batches(self, mock_get_llm):
+        mock_get_llm.return_value.ainvoke = AsyncMock(side_effect=self._label_all_supported)
+        answer = " ".join(f"Claim number {i} is supported." for i in range(1, 6))
+
+        streamed, verification = asyncio.run(
+            verify_answer_stream(self._stream(answer), docs=[])
+        )
+
+        assert streamed.strip() == answer
+        assert [c["text"] for c in verification["claims"]] == extract_claims(answer)
+        assert verification["confidence"] == 1.0
+        # 5 claims with a batch size of 4 -> two verification calls
+        assert mock_get_llm.return_value.ainvoke.await_count == 2
+
+    @patch("agents.compliance_checker.get_llm")
+    def test_verifies_batches_concurrently_up_to_limit(self, mock_get_llm):
+        in_flight = peak = 0
+
+        async def slow_label(prompt: str):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return await self._label_all_supported(prompt)
+
+        mock_get_llm.return_value.ainvoke = AsyncMock(side_effect=slow_label)
+        # 20 claims -> five batches, released together at the end of the stream
+        answer = " ".join(f"Claim number {i} is supported." for i in range(1, 21))
+
+        async def one_chunk():
+            yield answer
+
+        _, verification = asyncio.run(verify_answer_stream(one_chunk(), docs=[]))
+
+        assert verification["confidence"] == 1.0
+        assert mock_get_llm.return_value.ainvoke.await_count == 5
+        assert peak == MAX_CONCURRENT_BATCHES
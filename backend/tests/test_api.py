@@ -2,16 +2,22 @@
 Tests for the FastAPI endpoints.
 
 Uses FastAPI's TestClient which simulates HTTP requests
-without actually starting a server. We mock the ask_question
+without actually starting a server. We mock the ask_question_with_etag
 function so tests don't call the real AI pipeline.
 """
 
 from unittest.mock import patch
+
+import pytest
 from fastapi.testclient import TestClient
+
+from graph import response_cache
 from main import app
 
 client = TestClient(app)
 
+RESPONSE = {"answer": "SR 11-7 requires validation...", "confidence": 0.9}
+
 
 class TestHealthEndpoint:
     """Test the /api/health endpoint."""
@@ -29,7 +35,7 @@ class TestHealthEndpoint:
 class TestAskEndpoint:
     """Test the /api/ask endpoint."""
 
-    @patch("main.ask_question")
+    @patch("main.ask_question_with_etag")
     def test_ask_returns_200(self, mock_ask):
         mock_ask.return_value = {
             "answer": "Test answer",
@@ -37,12 +43,12 @@ class TestAskEndpoint:
             "confidence": 0.95,
             "query_type": "LOOKUP",
             "verification": {"confidence": 0.95, "summary": "1/1 supported"},
-        }
+        }, None
 
         response = client.post("/api/ask", json={"question": "Test question"})
         assert response.status_code == 200
 
-    @patch("main.ask_question")
+    @patch("main.ask_question_with_etag")
     def test_ask_returns_correct_structure(self, mock_ask):
         mock_ask.return_value = {
             "answer": "SR 11-7 requires validation...",
@@ -50,7 +56,7 @@ class TestAskEndpoint:
             "confidence": 0.9,
             "query_type": "LOOKUP",
             "verification": {"confidence": 0.9},
-        }
+        }, None
 
         response = client.post(
             "/api/ask",
@@ -72,3 +78,83 @@ class TestAskEndpoint:
     def test_ask_rejects_missing_question(self):
         response = client.post("/api/ask", json={"wrong_field": "test"})
         assert response.status_code == 422
+
+
+class TestAskEtag:
+    """Test ETag / If-None-Match on /api/ask."""
+
+    QUESTION = "What does SR 11-7 require?"
+
+    @pytest.fixture(autouse=True)
+    def cached_answer(self):
+        response_cache.store([1.0, 0.0], RESPONSE, question=self.QUESTION)
+        yield
+        response_cache.clear()
+
+    @patch("main.ask_question_with_etag")
+    def test_cached_answer_has_etag(self, mock_ask):
+        mock_ask.return_value = RESPONSE, response_cache.etag(self.QUESTION)
+
+        response = client.post("/api/ask", json={"question": self.QUESTION})
+
+        assert response.headers["etag"] == response_cache.etag(self.QUESTION)
+
+    @patch("main.ask_question_with_etag")
+    def test_uncached_answer_has_no_etag(self, mock_ask):
+        # A fresh, unconfident answer isn't stored; the cache still holds an
+        # answer to the same question, but its tag describes a different body
+        mock_ask.return_value = {**RESPONSE, "confidence": 0.3}, None
+
+        response = client.post("/api/ask?nocache=1", json={"question": self.QUESTION})
+
+        assert "etag" not in response.headers
+
+    @patch("main.ask_question_with_etag")
+    def test_matching_etag_returns_304(self, mock_ask):
+        etag = response_cache.etag(self.QUESTION)
+
+        response = client.post(
+            "/api/ask",
+            json={"question": self.QUESTION},
+            headers={"If-None-Match": etag},
+        )
+
+        assert response.status_code == 304
+        assert response.content == b""
+        mock_ask.assert_not_called()
+
+    @patch("main.ask_question_with_etag")
+    def test_stale_etag_gets_the_answer(self, mock_ask):
+        mock_ask.return_value = RESPONSE, response_cache.etag(self.QUESTION)
+
+        response = client.post(
+            "/api/ask",
+            json={"question": self.QUESTION},
+            headers={"If-None-Match": 'W/"outdated"'},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == RESPONSE
+
+
+class TestAskStreamEndpoint:
+    """Test the /api/ask/stream Server-Sent Events endpoint."""
+
+    @patch("main.ask_question_stream")
+    def test_streams_events(self, mock_stream):
+        async def events(question, use_cache):
+            yield "token", {"text": "SR 11-7 "}
+            yield "token", {"text": "requires validation."}
+            yield "result", {"answer": "SR 11-7 requires validation.", "confidence": 0.9}
+
+        mock_stream.side_effect = events
+
+        response = client.post("/api/ask/stream", json={"question": "What does SR 11-7 require?"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.split("\n\n")[:3] == [
+            'event: token\ndata: {"text":"SR 11-7 "}',
+            'event: token\ndata: {"text":"requires validation."}',
+            'event: result\ndata: {"answer":"SR 11-7 requires validation.","confidence":0.9}',
+        ]
@@ -0,0 +1,126 @@
+"""
+Tests for the semantic response cache.
+
+Embeddings here are tiny hand-made vectors, so we can control exactly
+how similar two "questions" are.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import graph
+from cache import SemanticCache
+
+RESPONSE = {"answer": "SR 11-7 requires validation...", "confidence": 0.9}
+
+
+class TestSemanticCache:
+    """Test lookups, expiry, and eviction."""
+
+    def test_miss_on_empty_cache(self):
+        cache = SemanticCache()
+        assert cache.lookup([1.0, 0.0]) is None
+
+    def test_hit_on_same_embedding(self):
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], RESPONSE)
+        assert cache.lookup([1.0, 0.0]) == RESPONSE
+
+    def test_hit_on_similar_embedding(self):
+        cache = SemanticCache(threshold=0.95)
+        cache.store([1.0, 0.0], RESPONSE)
+        # Cosine similarity ~0.995 — a paraphrase of the same question
+        assert cache.lookup([1.0, 0.1]) == RESPONSE
+
+    def test_miss_on_different_embedding(self):
+        cache = SemanticCache(threshold=0.95)
+        cache.store([1.0, 0.0], RESPONSE)
+        assert cache.lookup([0.0, 1.0]) is None
+
+    def test_returns_a_copy(self):
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], RESPONSE)
+        cache.lookup([1.0, 0.0])["answer"] = "changed"
+        assert cache.lookup([1.0, 0.0])["answer"] == RESPONSE["answer"]
+
+    def test_expired_entries_are_dropped(self):
+        cache = SemanticCache(ttl_seconds=60)
+        with patch("cache.time.monotonic", return_value=1000.0):
+            cache.store([1.0, 0.0], RESPONSE)
+        with patch("cache.time.monotonic", return_value=1061.0):
+            assert cache.lookup([1.0, 0.0]) is None
+        assert len(cache) == 0
+
+    def test_exact_lookup_ignores_case_and_whitespace(self):
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], RESPONSE, question="What does SR 11-7 require?")
+        assert cache.lookup_exact("  what does SR 11-7   require? ") == RESPONSE
+        assert cache.lookup_exact("What does ISO 42001 require?") is None
+
+    def test_evicts_least_recently_used(self):
+        cache = SemanticCache(max_entries=2)
+        cache.store([1.0, 0.0, 0.0], {"answer": "a"})
+        cache.store([0.0, 1.0, 0.0], {"answer": "b"})
+        cache.lookup([1.0, 0.0, 0.0])  # "a" is now the most recently used
+        cache.store([0.0, 0.0, 1.0], {"answer": "c"})
+
+        assert len(cache) == 2
+        assert cache.lookup([1.0, 0.0, 0.0]) == {"answer": "a"}
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+
+    def test_evicted_entries_leave_exact_index(self):
+        cache = SemanticCache(max_entries=1)
+        cache.store([1.0, 0.0], {"answer": "a"}, question="a?")
+        cache.store([0.0, 1.0], {"answer": "b"}, question="b?")
+        assert cache.lookup_exact("a?") is None
+        assert cache.lookup_exact("b?") == {"answer": "b"}
+
+    def test_etag_changes_with_the_answer(self):
+        cache = SemanticCache()
+        assert cache.etag("a?") is None
+
+        cache.store([1.0, 0.0], {"answer": "a"}, question="a?")
+        first = cache.etag("A? ")
+        assert first is not None and first.startswith('W/"')
+
+        cache.store([1.0, 0.0], {"answer": "a, rewritten"}, question="a?")
+        assert cache.etag("a?") not in (None, first)
+
+
+class TestAskQuestionCache:
+    """Test how ask_question uses the response cache."""
+
+    @patch("graph.aembed_query", new_callable=AsyncMock)
+    def test_exact_hit_skips_embedding(self, mock_aembed_query):
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], {**RESPONSE, "verification": {}}, question="What is SR 11-7?")
+
+        with patch.object(graph, "response_cache", cache):
+            result = asyncio.run(graph.ask_question("what is sr 11-7?"))
+
+        assert result["verification"]["cache"] == "hit"
+        mock_aembed_query.assert_not_awaited()
+
+    @patch("graph.aembed_query", new_callable=AsyncMock)
+    def test_hit_returns_the_etag_it_was_stored_with(self, mock_aembed_query):
+        cache = SemanticCache()
+        etag = cache.store([1.0, 0.0], {**RESPONSE, "verification": {}}, question="What is SR 11-7?")
+
+        with patch.object(graph, "response_cache", cache):
+            _, served_etag = asyncio.run(graph.ask_question_with_etag("What is SR 11-7?"))
+
+        assert served_etag == etag == cache.etag("What is SR 11-7?")
+
+    @patch("graph.aembed_query", new_callable=AsyncMock)
+    def test_hit_skips_pipeline_and_is_flagged(self, mock_aembed_query):
+        mock_aembed_query.return_value = [1.0, 0.0]
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], {**RESPONSE, "verification": {"confidence": 0.9}})
+
+        with patch.object(graph, "response_cache", cache), \
+                patch.object(graph.app, "ainvoke", new_callable=AsyncMock) as mock_ainvoke:
+            result = asyncio.run(graph.ask_question("What does SR 11-7 require?"))
+
+        assert result["answer"] == RESPONSE["answer"]
+        assert result["verification"]["cache"] == "hit"
+        mock_ainvoke.assert_not_awaited()
@@ -0,0 +1,159 @@
+"""
+Tests for the offline Batch API verification script.
+
+The OpenAI client and the vector store are mocked, so these tests only
+check how requests are built and how batch output is read back.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from langchain_core.documents import Document
+
+from agents.checker_batch import (
+    RESPONSE_FORMAT,
+    build_requests,
+    load_records,
+    merge_results,
+    read_labels,
+    retrieve_sources,
+)
+from agents.compliance_checker import ClaimLabel, VerificationResult, build_verification
+from agents.state import QueryType
+
+ANSWER = "SR 11-7 requires independent validation. Banks must keep a model inventory."
+
+
+def _output_line(custom_id: str, status_code: int, content: str | None = None) -> str:
+    body = {"choices": [{"message": {"content": content}}]}
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": status_code, "body": body},
+    })
+
+
+class TestLoadRecords:
+    """Test reading the input JSONL."""
+
+    def test_fills_missing_custom_ids_and_skips_blank_lines(self, tmp_path):
+        path = tmp_path / "queries.jsonl"
+        path.write_text(
+            '{"custom_id": "q-1", "question": "a?", "answer": "A."}\n'
+            "\n"
+            '{"question": "b?", "answer": "B."}\n'
+        )
+
+        records = load_records(path)
+
+        assert [r["custom_id"] for r in records] == ["q-1", "3"]
+
+
+class TestBuildRequests:
+    """Test the Batch API request lines."""
+
+    @patch("agents.checker_batch.retrieve_sources", new_callable=AsyncMock)
+    def test_uses_structured_outputs(self, mock_search):
+        mock_search.return_value = [
+            Document(page_content="Validation must be independent.",
+                     metadata={"regulation": "SR 11-7", "page": 9}),
+        ]
+        records = [{"custom_id": "q-1", "question": "What does SR 11-7 require?", "answer": ANSWER}]
+
+        [request] = asyncio.run(build_requests(records))
+
+        assert request["custom_id"] == "q-1"
+        assert request["body"]["response_format"] == RESPONSE_FORMAT
+        assert RESPONSE_FORMAT["type"] == "json_schema"
+        prompt = request["body"]["messages"][0]["content"]
+        assert "[SR 11-7 | Page 9]" in prompt
+        assert "2. Banks must keep a model inventory." in prompt
+
+    @patch("agents.checker_batch.retrieve_sources", new_callable=AsyncMock)
+    def test_skips_answers_without_claims(self, mock_search):
+        mock_search.return_value = []
+        records = [
+            {"custom_id": "q-1", "question": "a?", "answer": ANSWER},
+            {"custom_id": "q-2", "question": "b?", "answer": "No."},
+        ]
+
+        requests = asyncio.run(build_requests(records))
+
+        assert [r["custom_id"] for r in requests] == ["q-1"]
+        mock_search.assert_awaited_once_with("a?")
+
+    @patch("agents.checker_batch.retriever_agent", new_callable=AsyncMock)
+    @patch("agents.checker_batch.router_agent", new_callable=AsyncMock)
+    @patch("agents.checker_batch.aembed_query", new_callable=AsyncMock)
+    def test_sources_come_from_the_live_agents(self, mock_embed, mock_router, mock_retriever):
+        doc = Document(page_content="Validation must be independent.", metadata={})
+        mock_embed.return_value = [0.1, 0.2]
+        mock_router.return_value = {
+            "query_type": QueryType.LOOKUP,
+            "target_regulations": ("SR 11-7",),
+        }
+        mock_retriever.side_effect = lambda state: {**state, "retrieved_docs": [doc]}
+
+        docs = asyncio.run(retrieve_sources("What does SR 11-7 require?"))
+
+        assert docs == [doc]
+        state = mock_retriever.await_args.args[0]
+        assert state["query_type"] is QueryType.LOOKUP
+        assert state["target_regulations"] == ("SR 11-7",)
+        assert state["query_embedding"] == [0.1, 0.2]
+
+
+class TestReadLabels:
+    """Test parsing the batch output file."""
+
+    def test_failed_and_invalid_responses_are_none(self):
+        valid = VerificationResult(claims=[
+            ClaimLabel(id=1, status="SUPPORTED", source="SR 11-7, Page 9"),
+        ])
+        client = MagicMock()
+        client.files.content.return_value.text = "\n".join([
+            _output_line("ok", 200, valid.model_dump_json()),
+            _output_line("error", 500),
+            _output_line("truncated", 200, '{"claims": [{"id": 1'),
+            _output_line("refused", 200, None),
+        ])
+
+        labels = read_labels(client, MagicMock(output_file_id="file-1"))
+
+        assert labels["ok"] == valid
+        assert labels["error"] is None
+        assert labels["truncated"] is None
+        assert labels["refused"] is None
+
+    def test_no_output_file(self):
+        assert read_labels(MagicMock(), MagicMock(output_file_id=None)) == {}
+
+
+class TestMergeResults:
+    """Test attaching verification results to the input records."""
+
+    def test_builds_verification_per_record(self):
+        records = [
+            {"custom_id": "q-1", "question": "a?", "answer": ANSWER},
+            {"custom_id": "q-2", "question": "b?", "answer": ANSWER},
+        ]
+        labels = {
+            "q-1": VerificationResult(claims=[
+                ClaimLabel(id=1, status="SUPPORTED", source="SR 11-7, Page 9"),
+                ClaimLabel(id=2, status="UNSUPPORTED", source=None),
+            ]),
+            "q-2": None,
+        }
+
+        merged = merge_results(records, labels)
+
+        assert merged[0]["verification"]["confidence"] == 0.5
+        assert merged[0]["question"] == "a?"
+        assert merged[1]["verification"] is None
+
+    def test_answer_without_claims_gets_empty_verification(self):
+        records = [{"custom_id": "q-1", "question": "a?", "answer": "No."}]
+
+        [merged] = merge_results(records, {})
+
+        assert merged["verification"] == build_verification([], {})
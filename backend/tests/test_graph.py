@@ -0,0 +1,175 @@
+"""
+Tests for the LangGraph workflow wiring.
+
+The Router, Retriever, Synthesizer and Compliance Checker are mocked, so
+these tests only check how the graph moves between them: the speculative
+wide search, the low-confidence retry, and the streamed events.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+import graph
+from agents.state import QueryType
+from cache import SemanticCache
+
+
+def _doc(name: str) -> Document:
+    return Document(
+        page_content=f"Passage {name}",
+        metadata={"regulation": "SR 11-7", "source": "sr.pdf", "page": name},
+    )
+
+
+ROUTE = {"query_type": QueryType.EXPLAIN, "target_regulations": ()}
+MAIN_DOCS = [_doc("main")]
+# The wide search returns one chunk twice (e.g. ingestion was run twice)
+WIDE_DOCS = [_doc("wide-1"), _doc("wide-1"), _doc("wide-2")]
+
+
+class FakePipeline:
+    """Mocked agents; records the passages each verification ran against."""
+
+    def __init__(self, confidence: float):
+        self.confidence = confidence
+        self.verified_docs = []
+
+    async def router(self, state):
+        return ROUTE
+
+    async def retriever(self, state):
+        return {"retrieved_docs": MAIN_DOCS, "context_docs": MAIN_DOCS, "retry_count": 1}
+
+    async def stream_answer(self, state):
+        yield "Model validation must be "
+        yield "independent."
+
+    async def verify(self, chunks, docs):
+        answer = "".join([chunk async for chunk in chunks])
+        self.verified_docs.append(docs)
+        return answer, {"claims": [], "confidence": self.confidence, "summary": ""}
+
+
+@pytest.fixture
+def pipeline(request):
+    """Build the graph with mocked agents; confidence comes from the test's param."""
+    fake = FakePipeline(confidence=request.param)
+    with patch("graph.router_agent", fake.router), \
+         patch("graph.retriever_agent", fake.retriever), \
+         patch("graph.stream_answer", fake.stream_answer), \
+         patch("graph.verify_answer_stream", fake.verify), \
+         patch("graph.aembed_query", AsyncMock(return_value=[0.1, 0.2])), \
+         patch("agents.retriever.asimilarity_search", new_callable=AsyncMock) as wide_search:
+        wide_search.return_value = WIDE_DOCS
+        fake.wide_search = wide_search
+        with patch("graph.app", graph.build_graph()):
+            yield fake
+
+
+def _run(query: str = "What are the principles of model risk management?") -> dict:
+    return asyncio.run(graph.app.ainvoke(graph._initial_state(query, [0.1, 0.2], ROUTE)))
+
+
+class TestRetryLoop:
+    """Test the should_retry -> use_wide_docs -> synthesize_and_verify loop."""
+
+    @pytest.mark.parametrize("pipeline", [0.9], indirect=True)
+    def test_confident_answer_is_not_retried(self, pipeline):
+        result = _run()
+
+        assert pipeline.verified_docs == [MAIN_DOCS]
+        assert result["retry_count"] == 1
+
+    @pytest.mark.parametrize("pipeline", [0.2], indirect=True)
+    def test_low_confidence_retries_once_with_wide_docs(self, pipeline):
+        result = _run()
+
+        # The retry is verified against the deduplicated wide docs, and a
+        # second low score doesn't trigger another retry
+        assert pipeline.verified_docs == [MAIN_DOCS, [_doc("wide-1"), _doc("wide-2")]]
+        assert result["retrieved_docs"] == [_doc("wide-1"), _doc("wide-2")]
+        assert result["retry_count"] == 2
+
+    @pytest.mark.parametrize("pipeline", [0.2], indirect=True)
+    def test_failed_wide_search_keeps_the_answer(self, pipeline):
+        pipeline.wide_search.side_effect = RuntimeError("Chroma is down")
+
+        result = _run()
+
+        assert result["answer"] == "Model validation must be independent."
+        assert result["retrieved_docs_wide"] == []
+        assert pipeline.verified_docs == [MAIN_DOCS]
+
+
+class TestAskQuestionStream:
+    """Test the events streamed for a retried answer."""
+
+    @pytest.mark.parametrize("pipeline", [0.2], indirect=True)
+    def test_retry_event_separates_the_two_answers(self, pipeline):
+        async def collect():
+            return [
+                event async for event, _ in graph.ask_question_stream("Explain model risk", use_cache=False)
+            ]
+
+        events = asyncio.run(collect())
+
+        assert events == ["token", "token", "retry", "token", "token", "result"]
+
+
+class TestPrepare:
+    """Test routing the question while it is embedded and looked up."""
+
+    @patch("graph.response_cache", SemanticCache())
+    def test_router_runs_alongside_embedding(self):
+        router_started = asyncio.Event()
+
+        async def router(state):
+            router_started.set()
+            return ROUTE
+
+        async def embed(query):
+            # Only finishes if the Router gets to run in the meantime
+            await asyncio.wait_for(router_started.wait(), timeout=1)
+            return [0.1, 0.2]
+
+        with patch("graph.router_agent", router), patch("graph.aembed_query", embed):
+            cached, state = asyncio.run(graph._prepare("Explain model risk", use_cache=True))
+
+        assert cached is None
+        assert state["query_type"] is QueryType.EXPLAIN
+        assert state["query_embedding"] == [0.1, 0.2]
+
+    def test_cache_hit_cancels_the_router(self):
+        cache = SemanticCache()
+        cache.store([1.0, 0.0], {"answer": "Cached.", "verification": {}})
+        router_cancelled = False
+
+        async def router(state):
+            nonlocal router_cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                router_cancelled = True
+                raise
+
+        async def embed(query):
+            await asyncio.sleep(0)  # Let the Router start
+            return [1.0, 0.0]
+
+        async def prepare():
+            result = await graph._prepare("Explain model risk", use_cache=True)
+            await asyncio.sleep(0)  # Let the cancellation land
+            return result
+
+        with patch("graph.response_cache", cache), \
+                patch("graph.router_agent", router), patch("graph.aembed_query", embed):
+            cached, state = asyncio.run(prepare())
+
+        response, etag = cached
+        assert response["answer"] == "Cached."
+        assert etag is not None
+        assert state is None
+        assert router_cancelled
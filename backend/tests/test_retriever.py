@@ -0,0 +1,149 @@
+"""
+Tests for the vector store search helpers.
+
+The Chroma vector store is mostly replaced with a mock, so these tests
+only check how results are requested and post-processed. One test runs
+against an in-memory Chroma collection, to catch langchain-chroma
+upgrades that change how stored vectors are read.
+"""
+
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from ingestion.embeddings import CachedQueryEmbeddings
+from ingestion.ingest import COLLECTION_METADATA
+from ingestion.retriever import (
+    asimilarity_search,
+    asimilarity_search_multi,
+    asimilarity_search_with_context,
+)
+
+
+def _doc(regulation: str, page: int) -> Document:
+    return Document(
+        page_content=f"{regulation} page {page}",
+        metadata={"regulation": regulation, "page": page},
+    )
+
+
+class TestCachedQueryEmbeddings:
+    """Test the query embedding LRU cache."""
+
+    @patch.object(OpenAIEmbeddings, "aembed_query", new_callable=AsyncMock)
+    def test_repeated_query_is_embedded_once(self, mock_aembed_query):
+        mock_aembed_query.return_value = [0.1, 0.2]
+        embeddings = CachedQueryEmbeddings(model="text-embedding-3-small", api_key="test")
+
+        first = asyncio.run(embeddings.aembed_query("What is SR 11-7?"))
+        second = asyncio.run(embeddings.aembed_query("What is SR 11-7?"))
+
+        assert first == second == [0.1, 0.2]
+        mock_aembed_query.assert_awaited_once()
+
+
+class TestSimilaritySearch:
+    """Test the async single-query search."""
+
+    @patch("ingestion.retriever.get_vectorstore")
+    def test_records_relevance_scores(self, mock_get_vectorstore):
+        vectorstore = MagicMock()
+        vectorstore.similarity_search_by_vector_with_relevance_scores.return_value = [
+            (_doc("SR 11-7", 1), 0.1),
+            (_doc("SR 11-7", 2), 0.4),
+        ]
+        mock_get_vectorstore.return_value = vectorstore
+
+        results = asyncio.run(asimilarity_search("validation", k=2, embedding=[0.1, 0.2]))
+
+        assert [d.metadata["score"] for d in results] == [0.9, 0.6]
+
+
+class FixedEmbeddings(Embeddings):
+    """Looks each text's vector up in a dict instead of calling OpenAI."""
+
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.vectors[text]
+
+
+class TestSimilaritySearchWithContext:
+    """Test the search + MMR pick against a real in-memory Chroma."""
+
+    @patch("ingestion.retriever.get_vectorstore")
+    def test_scores_and_pick_from_stored_vectors(self, mock_get_vectorstore):
+        vectors = {
+            "Validation must be independent.": [1.0, 0.0, 0.0],
+            "Validation must be independent of development.": [1.0, 0.01, 0.0],
+            "Banks must keep a model inventory.": [0.6, 0.8, 0.0],
+        }
+        vectorstore = Chroma(
+            collection_name=f"test-{uuid.uuid4().hex}",
+            embedding_function=FixedEmbeddings(vectors),
+            collection_metadata=COLLECTION_METADATA,
+        )
+        vectorstore.add_texts(list(vectors), metadatas=[{"regulation": "SR 11-7"}] * 3)
+        mock_get_vectorstore.return_value = vectorstore
+
+        try:
+            docs, picked = asyncio.run(asimilarity_search_with_context(
+                "validation", k=3, context_k=2, embedding=[1.0, 0.0, 0.0], lambda_mult=0.25,
+            ))
+        finally:
+            vectorstore.delete_collection()
+
+        scores = {doc.page_content: doc.metadata["score"] for doc in docs}
+        assert scores["Validation must be independent."] == pytest.approx(1.0, abs=1e-3)
+        assert scores["Banks must keep a model inventory."] == pytest.approx(0.6, abs=1e-3)
+        # The near-duplicate loses its place to the different passage
+        assert [doc.page_content for doc in picked] == [
+            "Validation must be independent.",
+            "Banks must keep a model inventory.",
+        ]
+
+
+class TestSimilaritySearchMulti:
+    """Test the single-query, multi-regulation search."""
+
+    @patch("ingestion.retriever.get_vectorstore")
+    def test_one_filtered_query_grouped_by_regulation(self, mock_get_vectorstore):
+        vectorstore = MagicMock()
+        vectorstore.asimilarity_search_by_vector = AsyncMock(return_value=[
+            _doc("NIST AI RMF", 1),
+            _doc("SR 11-7", 2),
+            _doc("NIST AI RMF", 3),
+            _doc("NIST AI RMF", 4),
+            _doc("SR 11-7", 5),
+        ])
+        mock_get_vectorstore.return_value = vectorstore
+
+        results = asyncio.run(asimilarity_search_multi(
+            query="validation",
+            k_per_reg=2,
+            regulations=["SR 11-7", "NIST AI RMF"],
+            embedding=[0.1, 0.2],
+        ))
+
+        vectorstore.asimilarity_search_by_vector.assert_awaited_once()
+        _, kwargs = vectorstore.asimilarity_search_by_vector.call_args
+        assert kwargs["filter"] == {
+            "regulation": {"$in": ["SR 11-7", "NIST AI RMF"]}
+        }
+        assert [(d.metadata["regulation"], d.metadata["page"]) for d in results] == [
+            ("SR 11-7", 2),
+            ("SR 11-7", 5),
+            ("NIST AI RMF", 1),
+            ("NIST AI RMF", 3),
+        ]
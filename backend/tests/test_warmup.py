@@ -0,0 +1,36 @@
+"""
+Tests for the startup warmup.
+
+The pipeline is mocked, so these only check that the warmup can't hold
+up startup and doesn't leave its answer in the response cache.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import warmup
+
+
+class TestWarmupPipeline:
+    """Test warmup_pipeline() with a mocked ask_question."""
+
+    @patch("warmup.SKIP_WARMUP", False)
+    @patch("warmup.WARMUP_TIMEOUT", 0.01)
+    @patch("warmup.ask_question")
+    def test_slow_warmup_gives_up(self, mock_ask):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        mock_ask.side_effect = hang
+
+        # Returns (instead of raising or waiting) once the timeout passes
+        asyncio.run(asyncio.wait_for(warmup.warmup_pipeline(), timeout=1))
+
+    @patch("warmup.SKIP_WARMUP", False)
+    @patch("warmup.ask_question")
+    def test_answer_is_not_cached(self, mock_ask):
+        asyncio.run(warmup.warmup_pipeline())
+
+        _, kwargs = mock_ask.call_args
+        assert kwargs["use_cache"] is False
+        assert kwargs["cache_answer"] is False
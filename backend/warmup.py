@@ -0,0 +1,77 @@
+"""
+Startup warmup — build every long-lived client before the first request.
+
+All of the expensive objects in the backend are created lazily and then
+reused (the LLM clients, the embeddings model, the Chroma vector store).
+Without a warmup, the first question after a deploy pays for creating
+all of them. warmup() is called once when the FastAPI app starts, so
+that cost is paid before the server accepts traffic.
+
+warmup_pipeline() goes one step further and runs a real question through
+the whole pipeline, which also opens the connections to OpenAI and pages
+the vector index into memory. It costs a few LLM calls per worker, so it
+can be turned off with SKIP_WARMUP=1 (e.g. in tests or local dev).
+
+The server doesn't accept requests (or answer health checks) until the
+warmup is over, so it gives up after WARMUP_TIMEOUT seconds.
+"""
+
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from agents import compliance_checker, router, synthesizer
+from graph import ask_question
+from ingestion.embeddings import get_embeddings
+from ingestion.retriever import get_vectorstore
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+SKIP_WARMUP = os.getenv("SKIP_WARMUP") == "1"
+
+# Asked once per worker at startup
+WARMUP_QUESTION = "What does SR 11-7 say about model validation?"
+
+# Well under gunicorn's worker timeout (120s, see gunicorn_conf.py) and
+# the Docker health check's grace period: a slow or unreachable OpenAI
+# must not get the worker killed and restarted into another warmup.
+WARMUP_TIMEOUT = 20
+
+
+def warmup() -> None:
+    """Create all shared clients and open the vector store."""
+    get_embeddings()
+    get_vectorstore()
+    router.get_llm()
+    synthesizer.get_llm()
+    compliance_checker.get_llm()
+    logger.info("Warmup complete: LLM clients and vector store are ready")
+
+
+async def warmup_pipeline() -> None:
+    """
+    Run one question end to end, unless SKIP_WARMUP=1.
+
+    A failure or a timeout here (e.g. OpenAI is slow or unreachable) is
+    logged but doesn't stop the server from starting.
+    """
+    if SKIP_WARMUP:
+        return
+
+    try:
+        # Bypass the response cache so every agent actually runs, and keep
+        # the answer out of it: no user asked this question
+        await asyncio.wait_for(
+            ask_question(WARMUP_QUESTION, use_cache=False, cache_answer=False),
+            timeout=WARMUP_TIMEOUT,
+        )
+    except TimeoutError:
+        logger.warning("Pipeline warmup timed out after %ss; starting anyway", WARMUP_TIMEOUT)
+    except Exception:
+        logger.exception("Pipeline warmup failed; the first request will be slower")
+    else:
+        logger.info("Pipeline warmup complete")